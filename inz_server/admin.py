@@ -1,6 +1,7 @@
 from django.contrib import admin
 from inz_server.models import Zamowienie, Dieta, CustomUser, DietDay, Meal, UserDiet, DietMeal, Ingredient, \
-    MealIngredient, TrainingSession, ExerciseSeries, Exercise, BodyMeasurement, Exercise2, EmailVerificationToken
+    MealIngredient, TrainingSession, ExerciseSeries, Exercise, BodyMeasurement, Exercise2, EmailVerificationToken, \
+    MealAIJob, UserProgress, OutgoingEmail
 
 admin.site.register(Zamowienie)
 admin.site.register(CustomUser)
@@ -17,3 +18,6 @@ admin.site.register(Exercise)
 admin.site.register(BodyMeasurement)
 admin.site.register(Exercise2)
 admin.site.register(EmailVerificationToken)
+admin.site.register(MealAIJob)
+admin.site.register(UserProgress)
+admin.site.register(OutgoingEmail)
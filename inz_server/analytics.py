@@ -0,0 +1,85 @@
+from datetime import datetime, time, timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import ExerciseSeries, TrainingSession
+
+def load_series(user, start_date, end_date):
+    """Wszystkie serie użytkownika z zakresu dat jako DataFrame (jedno zapytanie o serie, jedno o daty sesji)."""
+    # Granice dnia w strefie czasowej aplikacji, żeby filtr mógł użyć indeksu (user, date) sesji
+    start = timezone.make_aware(datetime.combine(start_date, time.min))
+    end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), time.min))
+    sessions = TrainingSession.objects.filter(user=user, date__gte=start, date__lt=end)
+
+    # Ciężar rzutowany w SQL na float, a daty pobierane raz na sesję - konwersja Decimal/datetime
+    # dla każdej z dziesiątek tysięcy serii kosztowała więcej niż cała agregacja
+    rows = ExerciseSeries.objects.filter(exercise__training_session__in=sessions) \
+        .annotate(weight_value=Cast('weight', FloatField())) \
+        .values_list('exercise__name', 'exercise__training_session_id', 'weight_value', 'repetitions')
+    frame = pd.DataFrame.from_records(list(rows), columns=['exercise', 'session', 'weight', 'repetitions'])
+    dates = dict(sessions.values_list('id', 'date'))
+    frame['date'] = frame['session'].map(dates)
+    frame['weight'] = frame['weight'].astype(float)
+    frame['repetitions'] = frame['repetitions'].astype(int)
+    return frame
+
+
+def rounded(value):
+    return None if pd.isna(value) else round(float(value), 2)
+
+
+def exercise_progression(user, start_date, end_date):
+    """
+    Postęp w każdym ćwiczeniu: objętość (ciężar x powtórzenia), najlepsza seria, szacowany 1RM (wzór Epleya)
+    oraz zmiana tydzień do tygodnia. Wszystkie agregacje liczone są wektorowo w pandas.
+    """
+    frame = load_series(user, start_date, end_date)
+    if frame.empty:
+        return []
+
+    frame['volume'] = frame['weight'] * frame['repetitions']
+    frame['e1rm'] = frame['weight'].where(frame['repetitions'] <= 1, frame['weight'] * (1 + frame['repetitions'] / 30))
+    local_dates = pd.to_datetime(frame['date'], utc=True).dt.tz_convert(settings.TIME_ZONE).dt.tz_localize(None)
+    frame['week'] = local_dates.dt.to_period('W').dt.start_time.dt.date
+
+    totals = frame.groupby('exercise').agg(
+        sets=('volume', 'size'),
+        sessions=('session', 'nunique'),
+        total_volume=('volume', 'sum'),
+        estimated_1rm=('e1rm', 'max'),
+    )
+    best_sets = frame.loc[frame.groupby('exercise')['e1rm'].idxmax(), ['exercise', 'weight', 'repetitions', 'date']] \
+        .set_index('exercise')
+
+    weekly = frame.groupby(['exercise', 'week'], sort=True).agg(volume=('volume', 'sum'), e1rm=('e1rm', 'max')) \
+        .reset_index()
+    # Zmiana względem poprzedniego tygodnia, w którym ćwiczenie było wykonywane
+    by_exercise = weekly.groupby('exercise')
+    weekly['volume_change'] = by_exercise['volume'].pct_change() * 100
+    weekly['e1rm_change'] = by_exercise['e1rm'].pct_change() * 100
+
+    result = []
+    for exercise, weeks in weekly.groupby('exercise', sort=False):
+        total = totals.loc[exercise]
+        best = best_sets.loc[exercise]
+        latest = weeks.iloc[-1]
+        result.append({
+            'exercise': exercise,
+            'sets': int(total['sets']),
+            'sessions': int(total['sessions']),
+            'total_volume': rounded(total['total_volume']),
+            'estimated_1rm': rounded(total['estimated_1rm']),
+            'best_set': {'weight': rounded(best['weight']), 'repetitions': int(best['repetitions']),
+                         'date': best['date']},
+            'trend': {'volume_change_pct': rounded(latest['volume_change']),
+                      'estimated_1rm_change_pct': rounded(latest['e1rm_change'])},
+            'weekly': [
+                {'week': week, 'volume': rounded(volume), 'estimated_1rm': rounded(e1rm)}
+                for week, volume, e1rm in zip(weeks['week'], weeks['volume'], weeks['e1rm'])
+            ],
+        })
+    return sorted(result, key=lambda item: item['total_volume'], reverse=True)
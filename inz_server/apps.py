@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class InzServerConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'inz_server'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,161 @@
+"""
+Asynchroniczne wersje najczęściej czytanych endpointów. urls.py wybiera je, gdy ASYNC_VIEWS = True
+(domyślnie wyłączone - w pomiarach benchmark_asgi nie były szybsze od WSGI), żeby pod serwerem ASGI
+wolni klienci nie blokowali wątków workera. DRF 3.14 nie obsługuje widoków async - uwierzytelnianie JWT,
+zwolnienie z CSRF i odpowiedzi JSON są tu zrobione ręcznie.
+"""
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from . import views
+from .authentication import CachedJWTAuthentication
+from .diet_plans import day_meals, with_virtual_days
+from .meal_cache import meal_catalog
+from .models import BodyMeasurement, DietDay, DietMeal, UserDiet, Zamowienie
+from .progress import get_progress
+from .renderers import ORJSONResponse, dumps
+from .search import search_meal_ids
+from .serializers import BodyMeasurementSerializer
+
+authenticator = CachedJWTAuthentication()
+
+
+def api_response(data, status=200):
+    # Ten sam format co domyślny renderer DRF (ORJSONRenderer)
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def csrf_exempt(view):
+    """
+    Jak APIView z DRF: token JWT w nagłówku nie jest wysyłany przez przeglądarkę sam, więc CSRF nie dotyczy
+    tych widoków. csrf_exempt z Django 4.2 opakowuje widok funkcją sync, tu tylko go oznaczamy.
+    """
+    view.csrf_exempt = True
+    return view
+
+
+def require_get(view):
+    """Odpowiednik @api_view(['GET']) - require_GET z Django 4.2 nie obsługuje widoków async."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            response = api_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            response['Allow'] = 'GET'
+            return response
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def jwt_required(view):
+    """Odpowiednik IsAuthenticated + CachedJWTAuthentication dla widoków async."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await sync_to_async(authenticator.authenticate)(request)
+        except (AuthenticationFailed, InvalidToken) as e:
+            response = api_response(e.detail if isinstance(e.detail, dict) else {'detail': e.detail}, status=401)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+        if result is None:
+            response = api_response({'detail': 'Authentication credentials were not provided.'}, status=401)
+            response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+        request.user, request.auth = result
+        return await view(request, *args, **kwargs)
+
+    return csrf_exempt(wrapper)
+
+
+@require_get
+@jwt_required
+async def diet_plans_view(request):
+    try:
+        start_date_obj = datetime.strptime(request.GET.get('startDate'), '%Y-%m-%d').date()
+        end_date_obj = datetime.strptime(request.GET.get('endDate'), '%Y-%m-%d').date()
+
+        order = await Zamowienie.objects.select_related('dieta').filter(uzytkownik=request.user) \
+            .alatest('data_rozpoczecia')
+        user_diet = await UserDiet.objects.filter(user=request.user).alatest('data_rozpoczecia')
+        diet_days = [diet_day async for diet_day in DietDay.objects.filter(
+            user_diet=user_diet,
+            date__range=[start_date_obj, end_date_obj]
+        ).prefetch_related(
+            Prefetch('dietmeal_set', queryset=DietMeal.objects.order_by('id'))
+        )]
+        diet_days = with_virtual_days(user_diet, start_date_obj, end_date_obj, diet_days)
+        meals = await sync_to_async(meal_catalog.get_many)({dm.meal_id for dd in diet_days for dm in day_meals(dd)})
+        return ORJSONResponse(views.diet_plan_data(order, user_diet, diet_days, meals), safe=False)
+
+    except Exception as e:
+        return ORJSONResponse({'error': str(e)}, status=400)
+
+
+async def get_meal(request, meal_id):
+    meal = await sync_to_async(meal_catalog.get)(meal_id)
+    if meal is None:
+        return ORJSONResponse({"error": "Meal not found"}, status=404)
+    return ORJSONResponse(views.meal_detail(meal))
+
+
+@require_get
+async def search_meals(request):
+    meal_ids = await sync_to_async(search_meal_ids)(request.GET.get('query', ''), limit=10)
+    meals = await sync_to_async(meal_catalog.get_many)(meal_ids)
+    return ORJSONResponse([views.meal_search_result(meals[meal_id]) for meal_id in meal_ids if meal_id in meals],
+                          safe=False)
+
+
+@require_get
+@jwt_required
+async def user_progress(request):
+    progress = await sync_to_async(get_progress)(request.user)
+    trainings = [training async for training in views.last_trainings(request.user)]
+    return api_response(views.progress_data(progress, trainings))
+
+
+@csrf_exempt
+async def body_measurements(request):
+    if request.method != 'GET':
+        # Zapis pomiaru zostaje w widoku DRF (walidacja serializerem)
+        return await sync_to_async(views.BodyMeasurementList.as_view())(request)
+    return await body_measurement_list(request)
+
+
+@jwt_required
+async def body_measurement_list(request):
+    measurements = [measurement async for measurement in
+                    BodyMeasurement.objects.filter(user=request.user).order_by('date')]
+    return api_response(BodyMeasurementSerializer(measurements, many=True).data)
+
+
+async def iterate_in_thread(chunks):
+    # Eksport idzie generatorem sync (iterator() z prefetch_related nie ma wersji async w Django 4.2);
+    # każdy kawałek pobierany jest w wątku sync_to_async, bez wczytywania całości do pamięci
+    while True:
+        chunk = await sync_to_async(next)(chunks, None)
+        if chunk is None:
+            break
+        yield chunk
+
+
+@require_get
+@jwt_required
+async def export_diet_plan(request, export_format):
+    if export_format not in views.EXPORT_FORMATS:
+        return ORJSONResponse({'error': f"Nieobsługiwany format: {export_format}"}, status=400)
+    try:
+        start_date, end_date = views.export_range(request)
+        user_diet = await UserDiet.objects.filter(user=request.user).alatest('data_rozpoczecia')
+    except (ValueError, UserDiet.DoesNotExist) as e:
+        return ORJSONResponse({'error': str(e)}, status=400)
+
+    chunks = views.export_chunks(user_diet, start_date, end_date, export_format)
+    return views.export_response(iterate_in_thread(chunks), user_diet, export_format)
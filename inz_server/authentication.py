@@ -0,0 +1,82 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+
+class UserCache:
+    """
+    Użytkownicy (razem z grupami) w pamięci procesu: LRU na AUTH_USER_CACHE_SIZE wpisów, ważne
+    AUTH_USER_CACHE_TTL sekund. Sygnały usuwają wpis po zapisie użytkownika i zmianie grup;
+    w innych procesach zmiana jest widoczna najpóźniej po upływie TTL.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= settings.AUTH_USER_CACHE_TTL:
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, user):
+        with self.lock:
+            self.entries[user_id] = (time.monotonic(), user)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > settings.AUTH_USER_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+user_cache = UserCache()
+
+
+def user_roles(user):
+    # Grupy użytkownika z uwierzytelnienia są już pobrane (prefetch) - bez zapytania do bazy
+    return [group.name for group in user.groups.all()]
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication, które nie pobiera użytkownika z bazy przy każdym żądaniu."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = get_user_model().objects.prefetch_related('groups') \
+                    .get(**{api_settings.USER_ID_FIELD: user_id})
+            except get_user_model().DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            user_cache.set(user_id, user)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        # Kopia, żeby zmiany request.user w widoku nie trafiały do współdzielonego wpisu
+        return copy.copy(user)
@@ -0,0 +1,254 @@
+import json
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import count
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import get_resolver, URLPattern, URLResolver
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import user_cache
+from .datasets import DATASET_PASSWORD, generate_dataset
+from .diet_plans import AI_DIET_ID
+from .exercise_index import exercise_index
+from .meal_cache import meal_catalog
+from .models import CustomUser, Dieta, Zamowienie, UserDiet, DietDay, DietMeal, Meal, TrainingSession, \
+    BodyMeasurement, EmailVerificationToken
+
+# Trasy z urls.py, których nie da się sensownie wywołać klientem testowym
+SKIPPED_ROUTES = {
+    'works/fitter/api/mealAI/': "MealAI to funkcja pomocnicza (user_diet, duration), a nie widok",
+}
+
+
+class BenchmarkContext:
+    """Obiekty z wygenerowanego zbioru, na których operują przypadki testowe."""
+
+    def __init__(self, months):
+        self.user = CustomUser.objects.order_by('id').first()
+        self.scratch_user = CustomUser.objects.order_by('id').last()
+        self.staff = CustomUser.objects.create_superuser('bench_admin', 'admin@example.com', DATASET_PASSWORD)
+        # Jedna sesja panelu admina na cały pomiar - force_login przy każdym żądaniu zapisywałby last_login
+        staff_client = Client()
+        staff_client.force_login(self.staff)
+        self.staff_cookies = staff_client.cookies
+        self.order = Zamowienie.objects.filter(uzytkownik=self.user).latest('data_rozpoczecia')
+        self.user_diet = self.order.user_diet
+        self.days = list(DietDay.objects.filter(user_diet=self.user_diet).order_by('date'))
+        self.start_date = str(self.days[0].date)
+        self.end_date = str(self.days[-1].date)
+        self.meal = Meal.objects.order_by('id').first()
+        self.session = TrainingSession.objects.filter(user=self.user).order_by('-date').first()
+        self.measurement = BodyMeasurement.objects.filter(user=self.user).order_by('-date').first()
+        self.verification_token = EmailVerificationToken.objects.filter(user=self.user).first().token
+        self.ai_diet = UserDiet.objects.create(user=self.scratch_user, dieta=Dieta.objects.get(id=AI_DIET_ID))
+        Zamowienie.objects.create(uzytkownik=self.scratch_user, dieta_id=AI_DIET_ID, user_diet=self.ai_diet,
+                                  status='aipending')
+        self.months = months
+        self.counter = count()
+
+    def edited_days(self, days=7):
+        meals = DietMeal.objects.filter(diet_day__in=self.days[:days]).order_by('id')
+        by_day = {day.id: [] for day in self.days[:days]}
+        for diet_meal in meals:
+            by_day[diet_meal.diet_day_id].append({
+                'uuid': str(diet_meal.uuid), 'id': diet_meal.meal_id, 'meal_type': diet_meal.meal_type,
+                'grams': diet_meal.quantity + next(self.counter) % 2, 'unit': diet_meal.unit,
+            })
+        return [{'date': str(day.date), 'meals': by_day[day.id]} for day in self.days[:days]]
+
+    def workout(self, exercises=8, sets=4):
+        return {
+            'date': '2026-01-01T10:00:00Z',
+            'notes': '',
+            'exercises': [{'name': f'Ćwiczenie {number}', 'series': [{'weight': '60.00', 'repetitions': 8}] * sets}
+                          for number in range(exercises)],
+        }
+
+    def ai_plan(self):
+        start = self.days[0].date
+        return [{'date': str(start + timedelta(days=day)), 'total_calories': 2000, 'meals': [
+            {'name': self.meal.name, 'portions': 1, 'meal_type': 'lunch'},
+            {'name': 'Nieistniejący posiłek', 'portions': 1, 'meal_type': 'dinner'},
+        ]} for day in range(30)]
+
+
+# (etykieta, trasa z urls.py, metoda, użytkownik, ścieżka, dane)
+CASES = [
+    ('admin', 'works/fitter/api/admin/', 'get', 'staff', lambda c: '/works/fitter/api/admin/', None),
+    ('metrics', 'works/fitter/api/metrics/', 'get', 'staff', lambda c: '/works/fitter/api/metrics/', None),
+    ('token_obtain_pair', 'works/fitter/api/token/', 'post', None, lambda c: '/works/fitter/api/token/',
+     lambda c: {'username': c.user.username, 'password': DATASET_PASSWORD}),
+    ('register', 'works/fitter/api/register/', 'post', None, lambda c: '/works/fitter/api/register/',
+     lambda c: {'username': f'bench_new_{next(c.counter)}', 'email': 'new@example.com',
+                'password': DATASET_PASSWORD, 'confirm_password': DATASET_PASSWORD}),
+    ('profile-list', '', 'get', None, lambda c: '/profile/', None),
+    ('user_profile', 'works/fitter/api/profile/', 'get', 'user', lambda c: '/works/fitter/api/profile/', None),
+    ('create_order', 'works/fitter/api/zamowienia/', 'post', 'scratch_user', lambda c: '/works/fitter/api/zamowienia/',
+     lambda c: {'dieta_id': c.order.dieta_id, 'duration': c.months}),
+    ('user_orders', 'works/fitter/api/user_orders/', 'get', 'user', lambda c: '/works/fitter/api/user_orders/', None),
+    ('diet_plans', 'works/fitter/api/diet-plans/', 'get', 'user',
+     lambda c: f'/works/fitter/api/diet-plans/?startDate={c.start_date}&endDate={c.end_date}', None),
+    ('diet-plans-export', 'works/fitter/api/diet-plans/export/<str:export_format>/', 'get', 'user',
+     lambda c: '/works/fitter/api/diet-plans/export/ndjson/', None),
+    ('diet-plans-export-csv', 'works/fitter/api/diet-plans/export/<str:export_format>/', 'get', 'user',
+     lambda c: '/works/fitter/api/diet-plans/export/csv/', None),
+    ('diet_editor', 'works/fitter/api/dieteditor/', 'get', 'staff',
+     lambda c: f'/works/fitter/api/dieteditor/?orderID={c.order.id}&startDate={c.start_date}&endDate={c.end_date}',
+     None),
+    ('verify_token', 'works/fitter/api/verify-token/', 'post', None, lambda c: '/works/fitter/api/verify-token/',
+     lambda c: {'token': str(RefreshToken.for_user(c.user).access_token)}),
+    ('get_meal', 'works/fitter/api/meal/<int:meal_id>/', 'get', None,
+     lambda c: f'/works/fitter/api/meal/{c.meal.id}/', None),
+    ('search_meals', 'works/fitter/api/search_meals/', 'get', None,
+     lambda c: '/works/fitter/api/search_meals/?query=kurczak', None),
+    ('users-with-orders', 'works/fitter/api/users/', 'get', 'staff', lambda c: '/works/fitter/api/users/', None),
+    ('save_diet_day', 'works/fitter/api/save_diet_data/', 'post', 'staff',
+     lambda c: '/works/fitter/api/save_diet_data/',
+     lambda c: {'orderID': c.order.id, 'status': 'completed', 'diet_data': c.edited_days()}),
+    ('diet-preferences', 'works/fitter/api/diet-preferences/', 'post', 'user',
+     lambda c: '/works/fitter/api/diet-preferences/',
+     lambda c: {'diet_id': c.order.dieta_id, 'orderID': c.order.id, 'mealCount': 4, 'preferences_set': True,
+                'preferences': {'glutenFree': True}, 'foodPreferences': {'Owsianka': 2, 'Sushi': 0}}),
+    ('training-session', 'works/fitter/api/training-session/', 'post', 'user',
+     lambda c: '/works/fitter/api/training-session/', lambda c: c.workout()),
+    ('user-progress', 'works/fitter/api/user-progress/', 'get', 'user',
+     lambda c: '/works/fitter/api/user-progress/', None),
+    ('body-measurements', 'works/fitter/api/measurements/', 'get', 'user',
+     lambda c: '/works/fitter/api/measurements/', None),
+    ('trainings', 'works/fitter/api/trainings/', 'get', 'user', lambda c: '/works/fitter/api/trainings/', None),
+    ('trainings-page', 'works/fitter/api/trainings/', 'get', 'user',
+     lambda c: '/works/fitter/api/trainings/?page_size=20', None),
+    ('training-start', 'works/fitter/api/training-start/', 'get', 'scratch_user',
+     lambda c: '/works/fitter/api/training-start/', None),
+    ('callback-view', 'works/fitter/api/mealAIResponse/', 'post', None,
+     lambda c: '/works/fitter/api/mealAIResponse/',
+     lambda c: {'user_id': c.scratch_user.id, 'user_diet': c.ai_diet.id, 'diet_plan': c.ai_plan()}),
+    ('verify-email', 'works/fitter/api/verify/<uuid:token>/', 'get', None,
+     lambda c: f'/works/fitter/api/verify/{c.verification_token}/', None),
+    ('resend-verification-email', 'works/fitter/api/resend-verification-email/', 'post', None,
+     lambda c: '/works/fitter/api/resend-verification-email/', lambda c: {'username': c.scratch_user.username}),
+    ('exercise-progress', 'works/fitter/api/exercise-progress/', 'get', 'user',
+     lambda c: '/works/fitter/api/exercise-progress/', None),
+    ('body-measurement-series', 'works/fitter/api/measurements/series/', 'get', 'user',
+     lambda c: '/works/fitter/api/measurements/series/?bucket=week', None),
+    ('body-measurement-detail', 'works/fitter/api/measurements/<int:pk>/', 'get', 'user',
+     lambda c: f'/works/fitter/api/measurements/{c.measurement.id}/', None),
+    ('diet-ingredients', 'works/fitter/api/diet-ingredients/<str:start_date>/<str:end_date>/', 'get', 'user',
+     lambda c: f'/works/fitter/api/diet-ingredients/{c.start_date}/{c.end_date}/', None),
+    ('add_exercise_to_training_session', 'works/fitter/api/training-session/<int:training_id>/add-exercise', 'post',
+     'user', lambda c: f'/works/fitter/api/training-session/{c.session.id}/add-exercise',
+     lambda c: c.workout(exercises=1)['exercises'][0]),
+    ('search_exercises', 'works/fitter/api/exercises', 'get', None,
+     lambda c: '/works/fitter/api/exercises?search=szt', None),
+    ('user-data', 'works/fitter/api/user-data/', 'get', 'user', lambda c: '/works/fitter/api/user-data/', None),
+    ('change-password', 'works/fitter/api/change-password/', 'post', 'scratch_user',
+     lambda c: '/works/fitter/api/change-password/',
+     lambda c: {'old_password': DATASET_PASSWORD, 'new_password': DATASET_PASSWORD}),
+]
+
+
+def url_routes(patterns=None, prefix=''):
+    for pattern in patterns if patterns is not None else get_resolver().url_patterns:
+        if isinstance(pattern, URLResolver):
+            route = prefix + str(pattern.pattern)
+            if route.endswith('admin/'):
+                yield route
+            else:
+                yield from url_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield prefix + str(pattern.pattern)
+
+
+def uncovered_routes():
+    covered = {route for _, route, *_ in CASES} | SKIPPED_ROUTES.keys()
+    return sorted({route for route in url_routes() if not route.startswith(('^', 'profile')) and route not in covered})
+
+
+@contextmanager
+def isolated_metrics():
+    """Metryki żądań z pomiarów i testów trafiają do katalogu tymczasowego, a nie do METRICS_DIR serwera."""
+    with tempfile.TemporaryDirectory(prefix='fitter-metrics-') as directory, override_settings(METRICS_DIR=directory):
+        yield directory
+
+
+def reset_process_caches():
+    # Katalogi w pamięci procesu pamiętają dane z poprzedniej bazy testowej
+    cache.clear()
+    meal_catalog.records.clear()
+    exercise_index.invalidate()
+    user_cache.clear()
+
+
+def request(context, method, user, path, data):
+    client = Client()
+    headers = {}
+    if user == 'staff':
+        client.cookies.update(context.staff_cookies)
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(context.staff).access_token}'
+    elif user:
+        headers['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(getattr(context, user)).access_token}'
+    if method == 'get':
+        return client.get(path, **headers)
+    return client.post(path, json.dumps(data), content_type='application/json', **headers)
+
+
+def response_size(response):
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def run_scale(params, repeat=5, seed=0, stdout=None):
+    """Generuje zbiór danych w zadanej skali i mierzy każdy przypadek z CASES."""
+    reset_process_caches()
+    generate_dataset(seed=seed, **params)
+    context = BenchmarkContext(params['months'])
+
+    results = {}
+    for label, route, method, user, path, data in CASES:
+        timings = []
+        for attempt in range(repeat + 1):
+            payload = data(context) if data else None
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = request(context, method, user, path(context), payload)
+                size = response_size(response)
+                elapsed = (time.perf_counter() - started) * 1000
+            # Pierwsze wywołanie rozgrzewa katalogi w pamięci procesu
+            if attempt:
+                timings.append(elapsed)
+        results[label] = {
+            'status': response.status_code,
+            'queries': len(queries),
+            'time_ms': round(statistics.median(timings), 2),
+            'bytes': size,
+        }
+        if stdout:
+            stdout.write(f"  {label:<36} {response.status_code} {len(queries):>5} q "
+                         f"{results[label]['time_ms']:>9.2f} ms {size:>10} B")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Zwraca listę regresji względem zapisanej linii bazowej."""
+    regressions = []
+    for scale, cases in results.items():
+        for label, current in cases.items():
+            previous = baseline.get(scale, {}).get(label)
+            if previous is None:
+                continue
+            if current['status'] != previous['status']:
+                regressions.append(f"{scale}/{label}: status {previous['status']} -> {current['status']}")
+            if current['queries'] > previous['queries']:
+                regressions.append(f"{scale}/{label}: zapytania {previous['queries']} -> {current['queries']}")
+            # Próg bezwzględny 5 ms, żeby szum pomiaru szybkich widoków nie dawał fałszywych alarmów
+            if current['time_ms'] > previous['time_ms'] * (1 + tolerance) + 5:
+                regressions.append(f"{scale}/{label}: czas {previous['time_ms']} ms -> {current['time_ms']} ms")
+    return regressions
@@ -0,0 +1,143 @@
+"""
+Warstwa połączeń z bazą: pragmy SQLite ustawiane na każdym nowym połączeniu oraz router, który
+kieruje odczyty endpointów z REPLICA_READ_ROUTES do repliki, a zapisy zawsze do bazy głównej.
+"""
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB = 'replica'
+
+# Sesje, uprawnienia i użytkownicy zawsze z bazy głównej - opóźnienie repliki nie może cofnąć
+# np. zmiany hasła ani nadania roli
+PRIMARY_ONLY_APPS = {'auth', 'contenttypes', 'sessions', 'admin'}
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Backendy cache widoczne tylko w jednym procesie - przypięcie z jednego workera nie działałoby w innych
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def apply_sqlite_pragmas(connection):
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+    if connection.alias == REPLICA_DB:
+        connection.connection.execute('PRAGMA query_only = ON')
+
+
+def replica_configured():
+    return REPLICA_DB in settings.DATABASES
+
+
+def pin_key(user_id):
+    return f'db_primary_pin:{user_id}'
+
+
+class RoutingState:
+    """Stan routingu jednego żądania (w ContextVar, więc widoczny także w wątkach sync_to_async)."""
+
+    def __init__(self, request):
+        self.request = request
+        self.use_replica = False
+        self.wrote = False
+        self.pinned = None
+
+    def user_pinned(self):
+        # Użytkownik, który niedawno coś zapisał, czyta z bazy głównej, dopóki replika go nie dogoni
+        if self.pinned is None:
+            user = getattr(self.request, 'user', None)
+            if user is None or not user.is_authenticated:
+                return False
+            self.pinned = bool(cache.get(pin_key(user.pk)))
+        return self.pinned
+
+
+routing_state = ContextVar('db_routing_state', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        if state is None or not state.use_replica or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if model._meta.app_label in PRIMARY_ONLY_APPS or model._meta.label == settings.AUTH_USER_MODEL:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block or state.user_pinned():
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replika to kopia bazy głównej
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Oznacza żądania GET do tras z REPLICA_READ_ROUTES jako czytające z repliki. Po żądaniu, które coś
+    zapisało, przypina użytkownika do bazy głównej na REPLICA_PIN_SECONDS (read-your-writes).
+    Pin leży we współdzielonym cache Django, więc działa we wszystkich procesach.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_configured():
+            raise MiddlewareNotUsed
+        if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHES:
+            raise ImproperlyConfigured("Replika wymaga cache współdzielonego przez procesy (CACHE_BACKEND) - "
+                                       "inaczej zapis w jednym workerze nie przypnie odczytów w pozostałych.")
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(request)
+        token = routing_state.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            routing_state.reset(token)
+            if state.wrote:
+                self.pin_user(request)
+
+    async def __acall__(self, request):
+        state = RoutingState(request)
+        token = routing_state.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            routing_state.reset(token)
+            if state.wrote:
+                await sync_to_async(self.pin_user)(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = routing_state.get()
+        if state is not None and request.method in SAFE_METHODS \
+                and request.resolver_match.view_name in settings.REPLICA_READ_ROUTES:
+            state.use_replica = True
+
+    @staticmethod
+    def pin_user(request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            cache.set(pin_key(user.pk), True, settings.REPLICA_PIN_SECONDS)
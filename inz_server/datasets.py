@@ -0,0 +1,139 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .diet_plans import AI_DIET_ID
+from .models import CustomUser, Dieta, Meal, Ingredient, MealIngredient, UserDiet, Zamowienie, DietDay, DietMeal, \
+    DietDayIngredient, TrainingSession, Exercise, ExerciseSeries, BodyMeasurement, Exercise2, EmailVerificationToken, \
+    MeasurementUnit
+
+DATASET_PASSWORD = 'Fitter-Benchmark-123'
+
+SCALES = {
+    'small': {'users': 5, 'months': 1, 'meals': 60, 'trainings': 20, 'measurements': 10},
+    'medium': {'users': 20, 'months': 3, 'meals': 200, 'trainings': 150, 'measurements': 60},
+    'large': {'users': 50, 'months': 12, 'meals': 500, 'trainings': 500, 'measurements': 300},
+}
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'afternoon_snack', 'evening_snack']
+MEAL_WORDS = ['Owsianka', 'Sałatka', 'Zupa', 'Kurczak', 'Łosoś', 'Makaron', 'Ryż', 'Omlet', 'Wrap', 'Pierogi',
+              'Risotto', 'Jajecznica', 'Kasza', 'Placki', 'Gulasz']
+MEAL_ADDITIONS = ['z warzywami', 'z owocami', 'pomidorowa', 'z szynką', 'z fetą', 'z tuńczykiem', 'po grecku',
+                  'z awokado', 'z ciecierzycą', 'z pieczarkami', 'ze szpinakiem', 'curry']
+INGREDIENTS = [('jajka', MeasurementUnit.PIECES), ('mleko', MeasurementUnit.ML), ('płatki owsiane', MeasurementUnit.GRAMS),
+               ('pomidory', MeasurementUnit.GRAMS), ('ryż', MeasurementUnit.GRAMS), ('kurczak', MeasurementUnit.GRAMS),
+               ('łosoś', MeasurementUnit.GRAMS), ('oliwa', MeasurementUnit.ML), ('szpinak', MeasurementUnit.GRAMS),
+               ('banany', MeasurementUnit.PIECES), ('jogurt', MeasurementUnit.ML), ('makaron', MeasurementUnit.GRAMS)]
+EXERCISES = ['Wyciskanie sztangi leżąc', 'Przysiad ze sztangą', 'Martwy ciąg', 'Podciąganie na drążku',
+             'Wiosłowanie sztangą', 'Wyciskanie hantli nad głowę', 'Uginanie ramion ze sztangą', 'Pompki na poręczach',
+             'Wykroki z hantlami', 'Hip thrust', 'Prostowanie nóg na maszynie', 'Ściąganie drążka wyciągu']
+
+
+def generate_dataset(users, months, meals, trainings, measurements, seed=0, stdout=None):
+    """
+    Wypełnia bazę realistycznymi danymi: katalog posiłków i ćwiczeń, użytkowników z zamówieniami
+    i rozpisanymi dniami diety, treningi z seriami oraz pomiary ciała. Zwraca listę użytkowników.
+    """
+    rnd = random.Random(seed)
+    now = timezone.now()
+
+    def log(message):
+        if stdout:
+            stdout.write(message)
+
+    with transaction.atomic():
+        ai_diet, _ = Dieta.objects.get_or_create(id=AI_DIET_ID, defaults={'nazwa': 'Dieta AI', 'opis': '', 'cena': 0})
+        diet, _ = Dieta.objects.get_or_create(nazwa='Dieta standardowa', defaults={'opis': '', 'cena': Decimal('99.00')})
+
+        ingredients = Ingredient.objects.bulk_create([
+            Ingredient(name=name, measurement_unit=unit, amount=Decimal('1.00')) for name, unit in INGREDIENTS
+        ])
+        catalog = Meal.objects.bulk_create([
+            Meal(
+                name=f"{rnd.choice(MEAL_WORDS)} {rnd.choice(MEAL_ADDITIONS)} #{number}",
+                short_description='Posiłek testowy',
+                long_description='Opis przygotowania posiłku testowego. ' * 10,
+                preparation_time=rnd.randint(5, 60),
+                calories=rnd.randint(150, 900),
+                calories_per_100g=rnd.randint(50, 400),
+                default_grams=rnd.choice([100, 150, 200, 250]),
+                protein=rnd.randint(2, 50),
+                fats=rnd.randint(1, 40),
+                carbohydrates=rnd.randint(5, 120),
+                lactose=rnd.random() < 0.3,
+                gluten=rnd.random() < 0.4,
+            )
+            for number in range(meals)
+        ])
+        MealIngredient.objects.bulk_create([
+            MealIngredient(meal=meal, ingredient=ingredient, quantity=Decimal(rnd.randint(1, 200)))
+            for meal in catalog for ingredient in rnd.sample(ingredients, 3)
+        ])
+        search.index_meals([meal.id for meal in catalog])
+        Exercise2.objects.bulk_create([
+            Exercise2(name=f"{name} #{number}" if number else name, description=f"Opis: {name.lower()}")
+            for number in range(max(meals // 40, 1)) for name in EXERCISES
+        ], ignore_conflicts=True)
+        log(f"Katalog: {len(catalog)} posiłków, {len(ingredients)} składników")
+
+        password = make_password(DATASET_PASSWORD)
+        created_users = CustomUser.objects.bulk_create([
+            CustomUser(username=f"bench{seed}_{number}", email=f"bench{seed}_{number}@example.com",
+                       password=password, first_name='Jan', last_name='Testowy', city='Kraków',
+                       email_verified=True)
+            for number in range(users)
+        ])
+        EmailVerificationToken.objects.bulk_create([
+            EmailVerificationToken(user=user, verified=True) for user in created_users
+        ])
+
+        for user in created_users:
+            start = now - timedelta(days=rnd.randint(0, 10))
+            user_diet = UserDiet.objects.create(user=user, dieta=diet, data_rozpoczecia=start,
+                                                data_zakonczenia=start + timedelta(days=30 * months),
+                                                preferences_set=True, age=30, weight=80, height=180)
+            Zamowienie.objects.create(uzytkownik=user, dieta=diet, user_diet=user_diet, duration=months,
+                                      status='completed', data_rozpoczecia=start,
+                                      data_zakonczenia=start + timedelta(days=30 * months))
+            days = DietDay.objects.bulk_create([
+                DietDay(user_diet=user_diet, date=timezone.localtime(start).date() + timedelta(days=day))
+                for day in range(30 * months)
+            ])
+            DietMeal.objects.bulk_create([
+                DietMeal(diet_day=day, meal=rnd.choice(catalog), meal_type=meal_type,
+                         quantity=rnd.choice([100, 150, 200, 250]))
+                for day in days for meal_type in MEAL_TYPES[:rnd.randint(3, 5)]
+            ], batch_size=1000)
+            day_ids = [day.id for day in days]
+            for batch_start in range(0, len(day_ids), 500):
+                DietDayIngredient.refresh_for_days(day_ids[batch_start:batch_start + 500])
+
+            sessions = TrainingSession.objects.bulk_create([
+                TrainingSession(user=user, date=now - timedelta(days=number * 2, hours=rnd.randint(0, 12)),
+                                notes='')
+                for number in range(trainings)
+            ])
+            exercises = Exercise.objects.bulk_create([
+                Exercise(training_session=session, name=name)
+                for session in sessions for name in rnd.sample(EXERCISES, rnd.randint(4, 8))
+            ], batch_size=1000)
+            ExerciseSeries.objects.bulk_create([
+                ExerciseSeries(exercise=exercise, weight=Decimal(rnd.randint(10, 160)), repetitions=rnd.randint(3, 15))
+                for exercise in exercises for _ in range(rnd.randint(3, 5))
+            ], batch_size=1000)
+
+            BodyMeasurement.objects.bulk_create([
+                BodyMeasurement(user=user, date=timezone.localdate() - timedelta(days=number * 3),
+                                waist=Decimal(rnd.randint(700, 1000)) / 10, chest=Decimal(rnd.randint(850, 1200)) / 10,
+                                bicep=Decimal(rnd.randint(280, 450)) / 10, thigh=Decimal(rnd.randint(480, 700)) / 10)
+                for number in range(measurements)
+            ])
+            log(f"Użytkownik {user.username}: {len(days)} dni diety, {len(sessions)} treningów, "
+                f"{len(exercises)} ćwiczeń, {measurements} pomiarów")
+
+    return created_users
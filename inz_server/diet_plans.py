@@ -0,0 +1,270 @@
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import DietDay, DietMeal, Meal, MeasurementUnit, UserDiet
+
+# Dieta generowana przez MealAI - dni tworzy callback, a nie zamówienie
+AI_DIET_ID = 1
+
+DIET_MEAL_FIELDS = ['diet_day', 'meal_type', 'meal', 'quantity', 'unit']
+
+# Dni planu wczytywane jednym zapytaniem przy eksporcie
+EXPORT_CHUNK_DAYS = 100
+
+# Zapisy bulk oznaczają zmienione dni same - sygnały DietMeal są w nich pomijane
+bulk_writes = ContextVar('diet_plans_bulk_writes', default=False)
+
+
+@contextmanager
+def bulk_write():
+    token = bulk_writes.set(True)
+    try:
+        yield
+    finally:
+        bulk_writes.reset(token)
+
+
+def mark_diet_days_changed(diet_day_ids):
+    """Oznacza zmienione dni, które mogą należeć do różnych diet (zapisy spoza ścieżek bulk)."""
+    days_by_diet = defaultdict(set)
+    for day_id, user_diet_id in DietDay.objects.filter(id__in=diet_day_ids).values_list('id', 'user_diet_id'):
+        days_by_diet[user_diet_id].add(day_id)
+    for user_diet in UserDiet.objects.filter(id__in=days_by_diet.keys()):
+        user_diet.mark_days_changed(days_by_diet[user_diet.id])
+
+
+def create_plan_days(user_diet, duration_months):
+    """
+    Zakłada dni planu dla nowego zamówienia. W trybie leniwym (DIET_DAYS_LAZY) dni są
+    tylko wirtualne - wiersz DietDay powstaje przy pierwszym zapisie posiłku.
+    """
+    if user_diet.dieta_id == AI_DIET_ID or settings.DIET_DAYS_LAZY:
+        return []
+    start = user_diet.data_rozpoczecia
+    return DietDay.objects.bulk_create([
+        DietDay(user_diet=user_diet, date=(start + timedelta(days=day)).date())
+        for day in range(30 * duration_months)
+    ])
+
+
+def iter_plan_dates(user_diet, start_date, end_date):
+    if user_diet.dieta_id == AI_DIET_ID or user_diet.data_zakonczenia is None:
+        return
+    first_day = timezone.localtime(user_diet.data_rozpoczecia).date()
+    days_count = (user_diet.data_zakonczenia - user_diet.data_rozpoczecia).days
+    first = max(first_day, start_date)
+    last = min(first_day + timedelta(days=days_count - 1), end_date)
+    for i in range((last - first).days + 1):
+        yield first + timedelta(days=i)
+
+
+def plan_dates(user_diet, start_date, end_date):
+    return list(iter_plan_dates(user_diet, start_date, end_date))
+
+
+def with_virtual_days(user_diet, start_date, end_date, diet_days):
+    """
+    Uzupełnia zapisane dni o dni planu, które nie mają jeszcze wiersza w bazie,
+    i zwraca je posortowane po dacie.
+    """
+    diet_days = list(diet_days)
+    stored_dates = {diet_day.date for diet_day in diet_days}
+    diet_days += [DietDay(user_diet=user_diet, date=date_obj)
+                  for date_obj in plan_dates(user_diet, start_date, end_date) if date_obj not in stored_dates]
+    return sorted(diet_days, key=lambda diet_day: diet_day.date)
+
+
+def iter_plan_days(user_diet, start_date=None, end_date=None, chunk_size=EXPORT_CHUNK_DAYS):
+    """
+    Jak with_virtual_days, ale leniwie: zapisane dni czytane są iterator() partiami po chunk_size
+    (posiłki dociągane jednym zapytaniem na partię), więc pamięć nie rośnie z długością planu.
+    """
+    stored_days = DietDay.objects.filter(user_diet=user_diet)
+    if start_date:
+        stored_days = stored_days.filter(date__gte=start_date)
+    if end_date:
+        stored_days = stored_days.filter(date__lte=end_date)
+    stored_days = stored_days.order_by('date').prefetch_related(
+        Prefetch('dietmeal_set', queryset=DietMeal.objects.order_by('id'))
+    ).iterator(chunk_size=chunk_size)
+
+    stored = next(stored_days, None)
+    for date_obj in iter_plan_dates(user_diet, start_date or date.min, end_date or date.max):
+        while stored is not None and stored.date < date_obj:
+            yield stored
+            stored = next(stored_days, None)
+        if stored is not None and stored.date == date_obj:
+            yield stored
+            stored = next(stored_days, None)
+        else:
+            yield DietDay(user_diet=user_diet, date=date_obj)
+    while stored is not None:
+        yield stored
+        stored = next(stored_days, None)
+
+
+def day_meals(diet_day):
+    # Dzień wirtualny nie ma jeszcze posiłków
+    if diet_day.pk is None:
+        return []
+    return diet_day.dietmeal_set.all()
+
+
+def apply_diet_days(user_diet, diet_data):
+    """
+    Zapisuje dni diety z edytora dietetyka jako jeden diff: istniejące dni i posiłki
+    są ładowane jednym przebiegiem, a zmiany trafiają do bazy operacjami bulk
+    w jednej transakcji. Zwraca liczniki wykonanych operacji.
+    """
+    posted_days = []
+    for day_data in diet_data:
+        date_obj = datetime.strptime(day_data.get('date'), '%Y-%m-%d').date()
+        posted_days.append((date_obj, day_data.get('meals') or []))
+
+    posted_meals = [meal_data for _, meals_data in posted_days for meal_data in meals_data]
+    sent_meals_uuids = {uuid.UUID(str(meal_data['uuid'])) for meal_data in posted_meals if meal_data.get('uuid')}
+    meal_ids = set()
+    for meal_data in posted_meals:
+        if meal_data.get('id') is None:
+            raise ValueError("Posiłek bez id.")
+        meal_ids.add(int(meal_data['id']))
+
+    with transaction.atomic(), bulk_write():
+        days = {}
+        for diet_day in DietDay.objects.filter(user_diet=user_diet, date__in={d for d, _ in posted_days}).order_by('id'):
+            days.setdefault(diet_day.date, diet_day)
+        # Nowe dni tylko dla dat z posiłkami
+        new_days = [DietDay(user_diet=user_diet, date=date_obj)
+                    for date_obj in sorted({d for d, meals_data in posted_days if meals_data} - days.keys())]
+        DietDay.objects.bulk_create(new_days)
+        for diet_day in new_days:
+            days[diet_day.date] = diet_day
+
+        # Zachowanie jak Meal.objects.get_or_create(id=...) w poprzedniej wersji widoku
+        existing_meal_ids = set(Meal.objects.filter(id__in=meal_ids).values_list('id', flat=True))
+        Meal.objects.bulk_create([Meal(id=meal_id) for meal_id in meal_ids - existing_meal_ids])
+
+        day_ids = [diet_day.id for diet_day in days.values()]
+        existing = {
+            diet_meal.uuid: diet_meal
+            for diet_meal in DietMeal.objects.filter(Q(diet_day_id__in=day_ids) | Q(uuid__in=sent_meals_uuids))
+        }
+
+        to_create = {}
+        to_update = {}
+        changed_day_ids = {diet_day.id for diet_day in new_days}
+        for date_obj, meals_data in posted_days:
+            if not meals_data:
+                continue
+            diet_day = days[date_obj]
+            for meal_data in meals_data:
+                values = {
+                    'diet_day': diet_day,
+                    'meal_type': meal_data.get('meal_type'),
+                    'meal_id': int(meal_data['id']),
+                    'quantity': DietMeal._meta.get_field('quantity').to_python(meal_data.get('grams') or 0),
+                    'unit': meal_data.get('unit', 'GRAMS'),
+                }
+                meal_uuid = uuid.UUID(str(meal_data['uuid'])) if meal_data.get('uuid') else None
+                diet_meal = existing.get(meal_uuid)
+
+                if diet_meal is None:
+                    diet_meal = DietMeal(**values)
+                    if meal_uuid:
+                        diet_meal.uuid = meal_uuid
+                    to_create[diet_meal.uuid] = diet_meal
+                    changed_day_ids.add(diet_day.id)
+                elif (diet_meal.diet_day_id, diet_meal.meal_type, diet_meal.meal_id, diet_meal.quantity,
+                      diet_meal.unit) != (diet_day.id, values['meal_type'], values['meal_id'],
+                                          values['quantity'], values['unit']):
+                    # Przy przeniesieniu zmienia się też dzień źródłowy
+                    changed_day_ids.update((diet_meal.diet_day_id, diet_day.id))
+                    for field, value in values.items():
+                        setattr(diet_meal, field, value)
+                    to_update[diet_meal.uuid] = diet_meal
+
+        to_delete = [diet_meal for diet_meal in existing.values()
+                     if diet_meal.diet_day_id in day_ids and diet_meal.uuid not in sent_meals_uuids]
+        delete_ids = [diet_meal.id for diet_meal in to_delete]
+        changed_day_ids.update(diet_meal.diet_day_id for diet_meal in to_delete)
+
+        DietMeal.objects.bulk_create(to_create.values())
+        DietMeal.objects.bulk_update(to_update.values(), DIET_MEAL_FIELDS)
+        meals_deleted = DietMeal.objects.filter(id__in=delete_ids).delete()[0] if delete_ids else 0
+
+        if changed_day_ids:
+            user_diet.mark_days_changed(changed_day_ids)
+
+    return {
+        'days_created': len(new_days),
+        'meals_created': len(to_create),
+        'meals_updated': len(to_update),
+        'meals_deleted': meals_deleted,
+    }
+
+
+def ingest_generated_plan(user_diet, diet_plan):
+    """
+    Zapisuje plan z callbacku generatora MealAI. Nazwy posiłków są rozwiązywane jednym
+    zapytaniem, a dni, które mają już posiłki, są pomijane - ponowiony callback nic nie zmienia.
+    """
+    plan_days = {}
+    for day in diet_plan:
+        date_obj = parse_date(str(day['date']))
+        if date_obj is None:
+            raise ValueError(f"Nieprawidłowa data: {day['date']}")
+        plan_days.setdefault(date_obj, day['meals'])
+
+    names = {meal_data['name'] for meals_data in plan_days.values() for meal_data in meals_data}
+    meals = {}
+    for meal in Meal.objects.filter(name__in=names).order_by('id'):
+        meals.setdefault(meal.name, meal)
+
+    with transaction.atomic():
+        days = {}
+        filled_dates = set()
+        existing_days = DietDay.objects.filter(user_diet=user_diet, date__in=plan_days.keys()) \
+            .annotate(meal_count=Count('dietmeal')).order_by('id')
+        for diet_day in existing_days:
+            days.setdefault(diet_day.date, diet_day)
+            if diet_day.meal_count:
+                filled_dates.add(diet_day.date)
+
+        new_days = DietDay.objects.bulk_create([
+            DietDay(user_diet=user_diet, date=date_obj) for date_obj in plan_days if date_obj not in days
+        ])
+        for diet_day in new_days:
+            days[diet_day.date] = diet_day
+
+        diet_meals = [
+            DietMeal(
+                meal=meals[meal_data['name']],
+                diet_day=days[date_obj],
+                meal_type=meal_data['meal_type'],
+                quantity=meal_data['portions'] * 100,
+                unit=MeasurementUnit.GRAMS
+            )
+            for date_obj, meals_data in plan_days.items() if date_obj not in filled_dates
+            for meal_data in meals_data if meal_data['name'] in meals
+        ]
+        DietMeal.objects.bulk_create(diet_meals)
+
+        changed_day_ids = [days[date_obj].id for date_obj in plan_days if date_obj not in filled_dates]
+        if changed_day_ids:
+            user_diet.mark_days_changed(changed_day_ids)
+
+    return {
+        'days_created': len(new_days),
+        'days_skipped': len(filled_dates),
+        'meals_created': len(diet_meals),
+        'unmatched_meals': sorted(names - meals.keys()),
+    }
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from .models import Exercise2
+from .search import fold_text, tokenize
+
+EXACT, NAME_PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ExerciseIndex:
+    """
+    Indeks katalogu ćwiczeń w pamięci procesu: prefiksy słów i trigramy nazw.
+    Przebudowywany po zmianie katalogu (sygnały Exercise2) lub po EXERCISE_INDEX_TTL sekund,
+    żeby wyłapać zmiany zrobione w innych procesach.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = ([], {}, {})
+        self.built_at = None
+        self.generation = 0
+
+    def invalidate(self):
+        self.generation += 1
+        self.built_at = None
+
+    def build(self):
+        generation = self.generation
+        entries = []
+        prefixes = defaultdict(set)
+        grams = defaultdict(set)
+        catalog = Exercise2.objects.order_by('name').values_list('name', 'description')
+        for position, (name, description) in enumerate(catalog):
+            folded = fold_text(name)
+            entries.append((folded, name, description))
+            for word in tokenize(name):
+                for end in range(1, len(word) + 1):
+                    prefixes[word[:end]].add(position)
+            for gram in trigrams(folded):
+                grams[gram].add(position)
+        self.snapshot = (entries, dict(prefixes), dict(grams))
+        # Zmiana katalogu w trakcie budowy - następne zapytanie zbuduje indeks ponownie
+        self.built_at = time.monotonic() if generation == self.generation else None
+
+    def ensure_built(self):
+        built_at = self.built_at
+        if built_at is not None and time.monotonic() - built_at < settings.EXERCISE_INDEX_TTL:
+            return
+        with self.lock:
+            if self.built_at is built_at:
+                self.build()
+
+    def warm(self):
+        try:
+            self.ensure_built()
+        except DatabaseError:
+            # Np. przed pierwszą migracją - indeks zbuduje się przy pierwszym zapytaniu
+            self.invalidate()
+
+    @staticmethod
+    def rank(folded, position, prefixes, folded_query, tokens):
+        if folded == folded_query:
+            return EXACT
+        if folded.startswith(folded_query):
+            return NAME_PREFIX
+        if all(position in prefixes.get(token, ()) for token in tokens):
+            return WORD_PREFIX
+        return SUBSTRING
+
+    def search(self, query, offset=0, limit=20):
+        """Zwraca (liczba trafień, [(nazwa, opis), ...]) dla jednej strony wyników."""
+        self.ensure_built()
+        entries, prefixes, grams = self.snapshot
+        tokens = tokenize(query)
+        if not tokens:
+            return len(entries), [entry[1:] for entry in entries[offset:offset + limit]]
+
+        folded_query = ' '.join(tokens)
+        matches = None
+        for token in tokens:
+            found = set(prefixes.get(token, ()))
+            if len(token) >= 3:
+                candidates = set.intersection(*(grams.get(gram, set()) for gram in trigrams(token)))
+                found |= {position for position in candidates if token in entries[position][0]}
+            matches = found if matches is None else matches & found
+
+        ranked = sorted(
+            matches,
+            key=lambda position: (
+                self.rank(entries[position][0], position, prefixes, folded_query, tokens),
+                len(entries[position][0]),
+                position,
+            )
+        )
+        return len(ranked), [entries[position][1:] for position in ranked[offset:offset + limit]]
+
+
+exercise_index = ExerciseIndex()
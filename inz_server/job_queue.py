@@ -0,0 +1,54 @@
+"""
+Wspólna mechanika kolejek w bazie (MealAIJob, OutgoingEmail). Model kolejki ma pola status, attempts,
+next_attempt_at, locked_at i last_error oraz stałe QUEUED i FAILED; `options` to słownik ustawień
+kolejki (settings.MEALAI, settings.OUTBOX) z kluczami MAX_ATTEMPTS, BACKOFF_BASE, BACKOFF_MAX i LEASE_TIMEOUT.
+"""
+import logging
+import random
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempts, options):
+    delay = min(options['BACKOFF_BASE'] * 2 ** (attempts - 1), options['BACKOFF_MAX'])
+    return delay * random.uniform(0.5, 1.0)
+
+
+def requeue_stale(model, in_progress, options):
+    # Wpisy porzucone przez worker, który padł w trakcie wysyłki
+    lease_expired = timezone.now() - timedelta(seconds=options['LEASE_TIMEOUT'])
+    return model.objects.filter(status=in_progress, locked_at__lt=lease_expired) \
+        .update(status=model.QUEUED, locked_at=None)
+
+
+def claim(model, in_progress, limit):
+    """Zajmuje do `limit` gotowych wpisów. Warunkowy UPDATE - każdy wpis zajmuje tylko jeden worker."""
+    now = timezone.now()
+    candidates = model.objects.filter(status=model.QUEUED, next_attempt_at__lte=now) \
+                     .order_by('next_attempt_at').values_list('id', flat=True)[:limit]
+    claimed = []
+    for item_id in list(candidates):
+        updated = model.objects.filter(id=item_id, status=model.QUEUED) \
+            .update(status=in_progress, locked_at=now, attempts=F('attempts') + 1)
+        if updated:
+            claimed.append(item_id)
+    return claimed
+
+
+def record_failure(item, error, options):
+    """Po MAX_ATTEMPTS próbach oznacza wpis jako FAILED, wcześniej wraca do kolejki z opóźnieniem."""
+    model = type(item)
+    if item.attempts >= options['MAX_ATTEMPTS']:
+        logger.error("%s %s failed after %s attempts: %s", model.__name__, item.id, item.attempts, error)
+        model.objects.filter(id=item.id).update(status=model.FAILED, locked_at=None, last_error=str(error))
+        return model.FAILED
+    logger.warning("%s %s attempt %s failed: %s", model.__name__, item.id, item.attempts, error)
+    model.objects.filter(id=item.id).update(
+        status=model.QUEUED, locked_at=None, last_error=str(error),
+        next_attempt_at=timezone.now() + timedelta(seconds=backoff_delay(item.attempts, options)),
+    )
+    return model.QUEUED
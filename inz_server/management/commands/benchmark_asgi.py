@@ -0,0 +1,164 @@
+import asyncio
+import importlib.util
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from inz_server.benchmarks import isolated_metrics
+from inz_server.models import DietDay, Meal
+from inz_server.serializers import CustomTokenObtainPairSerializer
+
+SERVERS = {
+    # Klasyczny WSGI: każdy wolny klient zajmuje wątek workera
+    'wsgi': ('gunicorn', lambda port, options: [
+        '-m', 'gunicorn', 'inz_server.wsgi:application', '--bind', f'127.0.0.1:{port}',
+        '--workers', str(options['workers']), '--threads', str(options['threads']), '--log-level', 'warning',
+    ]),
+    # ASGI z widokami async (ASYNC_VIEWS=True w środowisku serwera)
+    'asgi': ('uvicorn', lambda port, options: [
+        '-m', 'uvicorn', 'inz_server.asgi:application', '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(options['workers']), '--log-level', 'warning', '--no-access-log',
+    ]),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def default_paths(user):
+    paths = ['/works/fitter/api/user-progress/', '/works/fitter/api/measurements/',
+             '/works/fitter/api/search_meals/?query=kurczak']
+    days = DietDay.objects.filter(user_diet__user=user).order_by('date').values_list('date', flat=True)
+    if days:
+        paths.append(f'/works/fitter/api/diet-plans/?startDate={days[0]}&endDate={days[min(6, len(days) - 1)]}')
+    meal_id = Meal.objects.order_by('id').values_list('id', flat=True).first()
+    if meal_id:
+        paths.append(f'/works/fitter/api/meal/{meal_id}/')
+    return paths
+
+
+async def fetch(port, path, token, client_delay):
+    """Jedno żądanie HTTP/1.1. Przy client_delay nagłówki wysyłane są po kawałku jak przez wolne łącze."""
+    lines = [f'GET {path} HTTP/1.1', f'Host: 127.0.0.1:{port}', f'Authorization: Bearer {token}',
+             'Accept: application/json', 'Connection: close']
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for line in lines:
+            writer.write(line.encode() + b'\r\n')
+            await writer.drain()
+            if client_delay:
+                await asyncio.sleep(client_delay / len(lines))
+        writer.write(b'\r\n')
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response[9:12])
+
+
+async def run_load(port, paths, token, concurrency, duration, client_delay):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(offset):
+        nonlocal errors
+        index = offset
+        while time.perf_counter() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                status = await fetch(port, path, token, client_delay)
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                status = None
+            if status is None or status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(offset) for offset in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    return statistics.quantiles(values, n=100, method='inclusive')[int(fraction * 100) - 1] if len(values) > 1 \
+        else (values[0] if values else 0.0)
+
+
+class Command(BaseCommand):
+    help = ("Porównuje przepustowość odczytów pod WSGI (gunicorn, wątki) i ASGI (uvicorn, widoki async) "
+            "przy wielu równoczesnych, wolnych klientach.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="Login użytkownika, którego tokenem wysyłane są żądania.")
+        parser.add_argument('--servers', nargs='+', choices=SERVERS.keys(), default=list(SERVERS))
+        parser.add_argument('--paths', nargs='+', help="Ścieżki odpytywane po kolei (domyślnie endpointy do odczytu).")
+        parser.add_argument('--concurrency', type=int, default=50, help="Liczba równoczesnych klientów.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Czas pomiaru w sekundach.")
+        parser.add_argument('--client-delay', type=float, default=0.0,
+                            help="Czas wysyłania nagłówków przez jednego klienta w sekundach (wolne łącze).")
+        parser.add_argument('--workers', type=int, default=1, help="Liczba procesów serwera.")
+        parser.add_argument('--threads', type=int, default=4, help="Wątki na proces gunicorna.")
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Nie ma użytkownika {options['user']}.")
+        token = str(CustomTokenObtainPairSerializer.get_token(user).access_token)
+        paths = options['paths'] or default_paths(user)
+
+        self.stdout.write(f"{options['concurrency']} klientów, {options['duration']} s, "
+                          f"opóźnienie klienta {options['client_delay']} s, ścieżki: {len(paths)}")
+        for name in options['servers']:
+            module, arguments = SERVERS[name]
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f"Brak pakietu {module} - zainstaluj go (pip install {module}).")
+
+            port = free_port()
+            with isolated_metrics() as metrics_dir:
+                env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE, METRICS_DIR=metrics_dir,
+                           ASYNC_VIEWS=str(name == 'asgi'))
+                log = tempfile.TemporaryFile()
+                server = subprocess.Popen([sys.executable, *arguments(port, options)], cwd=settings.BASE_DIR,
+                                          env=env, stdout=log, stderr=subprocess.STDOUT)
+                try:
+                    self.wait_for(server, port, log)
+                    latencies, errors, elapsed = asyncio.run(run_load(
+                        port, paths, token, options['concurrency'], options['duration'], options['client_delay']))
+                finally:
+                    server.terminate()
+                    server.wait(timeout=10)
+                    log.close()
+
+            self.stdout.write(
+                f"{name:5} {len(latencies) / elapsed:8.1f} req/s   "
+                f"p50 {percentile(latencies, 0.5) * 1000:8.1f} ms   p95 {percentile(latencies, 0.95) * 1000:8.1f} ms   "
+                f"błędy {errors}"
+            )
+
+    def wait_for(self, server, port, log, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"Serwer zakończył działanie:\n{log.read().decode()}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Serwer nie wystartował na porcie {port} w ciągu {timeout} s.")
@@ -0,0 +1,73 @@
+import json
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from inz_server.benchmarks import CASES, SKIPPED_ROUTES, compare, isolated_metrics, run_scale, uncovered_routes
+from inz_server.datasets import SCALES
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'baseline.json'
+
+
+class Command(BaseCommand):
+    help = ("Mierzy czas, liczbę zapytań i rozmiar odpowiedzi każdego endpointu na syntetycznych danych "
+            "(osobna baza testowa na każdą skalę) i porównuje wyniki z linią bazową.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', nargs='+', choices=SCALES.keys(), default=['small'])
+        parser.add_argument('--repeat', type=int, default=5, help="Liczba pomiarów na endpoint (mediana).")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Plik JSON z wynikami.")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE))
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help="Dopuszczalny względny wzrost czasu (0.5 = +50%%).")
+        parser.add_argument('--update-baseline', action='store_true',
+                            help="Zapisuje wyniki jako nową linię bazową zamiast porównywać.")
+
+    def handle(self, *args, **options):
+        for route in uncovered_routes():
+            self.stderr.write(self.style.WARNING(f"Brak przypadku testowego dla trasy: {route}"))
+        for route, reason in SKIPPED_ROUTES.items():
+            self.stdout.write(f"Pominięto {route}: {reason}")
+
+        setup_test_environment()
+        results = {}
+        try:
+            with isolated_metrics():
+                for scale in options['scales']:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f"Skala {scale} ({len(CASES)} przypadków)"))
+                    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                    try:
+                        results[scale] = run_scale(SCALES[scale], options['repeat'], options['seed'], self.stdout)
+                    finally:
+                        connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        report = json.dumps(results, indent=2, ensure_ascii=False) + '\n'
+        if options['output']:
+            Path(options['output']).write_text(report, encoding='utf-8')
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline']:
+            baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+            baseline.update(results)
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(baseline, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+            self.stdout.write(self.style.SUCCESS(f"Zapisano linię bazową: {baseline_path}"))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING("Brak linii bazowej - uruchom z --update-baseline."))
+            return
+
+        regressions = compare(results, json.loads(baseline_path.read_text(encoding='utf-8')), options['tolerance'])
+        for regression in regressions:
+            self.stderr.write(self.style.ERROR(f"Regresja: {regression}"))
+        if regressions:
+            sys.exit(1)
+        self.stdout.write(self.style.SUCCESS("Brak regresji względem linii bazowej."))
@@ -0,0 +1,86 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection
+from django.db.models import Prefetch
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from inz_server.datasets import generate_dataset
+from inz_server.diet_plans import day_meals
+from inz_server.meal_cache import meal_catalog
+from inz_server.models import DietDay, DietMeal, TrainingSession, Zamowienie
+from inz_server.renderers import ORJSONRenderer, django_default, dumps
+from inz_server.serializers import TrainingSessionSerializer
+from inz_server.views import diet_plan_data
+
+
+def median_ms(encode, data, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        content = encode(data)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(content)
+
+
+class Command(BaseCommand):
+    help = ("Porównuje czas kodowania dużych odpowiedzi (kalendarz diety, historia treningów) przez json "
+            "z biblioteki standardowej i przez orjson (inz_server.renderers). Dane generowane w bazie testowej.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, nargs='+', default=[1, 3, 12],
+                            help="Długości kalendarza diety w miesiącach.")
+        parser.add_argument('--trainings', type=int, default=300, help="Liczba treningów w historii.")
+        parser.add_argument('--repeat', type=int, default=20, help="Liczba pomiarów (mediana).")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        try:
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                payloads = self.build_payloads(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        drf_renderer, orjson_renderer = JSONRenderer(), ORJSONRenderer()
+        encoders = {
+            # JsonResponse: json.dumps z DjangoJSONEncoder; odpowiedzi DRF: JSONRenderer
+            'JsonResponse': (lambda data: json.dumps(data, cls=DjangoJSONEncoder).encode(),
+                             lambda data: dumps(data, default=django_default)),
+            'DRF': (drf_renderer.render, orjson_renderer.render),
+        }
+        self.stdout.write(f"{'odpowiedź':<28} {'koder':<13} {'rozmiar':>10} {'json':>10} {'orjson':>10} {'zysk':>7}")
+        for label, kind, data in payloads:
+            stdlib, fast = encoders[kind]
+            stdlib_ms, stdlib_size = median_ms(stdlib, data, options['repeat'])
+            fast_ms, fast_size = median_ms(fast, data, options['repeat'])
+            self.stdout.write(f"{label:<28} {kind:<13} {fast_size // 1024:>7} KB {stdlib_ms:>7.2f} ms "
+                              f"{fast_ms:>7.2f} ms {stdlib_ms / fast_ms:>6.1f}x")
+
+    def build_payloads(self, options):
+        user, = generate_dataset(users=1, months=max(options['months']), meals=200, trainings=options['trainings'],
+                                 measurements=10, seed=options['seed'])
+        order = Zamowienie.objects.select_related('dieta', 'user_diet').filter(uzytkownik=user) \
+            .latest('data_rozpoczecia')
+        diet_days = list(DietDay.objects.filter(user_diet=order.user_diet).order_by('date').prefetch_related(
+            Prefetch('dietmeal_set', queryset=DietMeal.objects.order_by('id'))
+        ))
+        meals = meal_catalog.get_many({dm.meal_id for dd in diet_days for dm in day_meals(dd)})
+
+        # Kalendarz jak z diet_plans_view (UUID, daty i datetime jako obiekty Pythona)
+        payloads = [
+            (f"diet-plans, {months} mies.", 'JsonResponse',
+             diet_plan_data(order, order.user_diet, diet_days[:months * 30], meals))
+            for months in options['months']
+        ]
+        sessions = TrainingSessionSerializer.setup_eager_loading(TrainingSession.objects.filter(user=user))
+        payloads.append((f"trainings, {options['trainings']} sesji", 'DRF',
+                         TrainingSessionSerializer(sessions, many=True).data))
+        return payloads
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from inz_server.datasets import SCALES, DATASET_PASSWORD, generate_dataset
+
+
+class Command(BaseCommand):
+    help = "Generuje syntetyczne dane (użytkownicy, zamówienia, dni diety, treningi, pomiary) w zadanej skali."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES.keys(), default='small')
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--months', type=int, help="Długość zamówienia każdego użytkownika.")
+        parser.add_argument('--meals', type=int, help="Wielkość katalogu posiłków.")
+        parser.add_argument('--trainings', type=int, help="Liczba treningów na użytkownika.")
+        parser.add_argument('--measurements', type=int, help="Liczba pomiarów ciała na użytkownika.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        params = dict(SCALES[options['scale']])
+        for name in params:
+            if options[name] is not None:
+                params[name] = options[name]
+
+        users = generate_dataset(seed=options['seed'], stdout=self.stdout, **params)
+        self.stdout.write(self.style.SUCCESS(
+            f"Utworzono {len(users)} użytkowników (hasło: {DATASET_PASSWORD})."
+        ))
@@ -0,0 +1,89 @@
+import json
+import random
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inz_server.models import Meal
+
+MEAL_TYPES = ['breakfast', 'lunch', 'dinner', 'afternoon_snack', 'evening_snack']
+
+
+def build_plan(payload, meal_names):
+    start = timezone.localdate()
+    meals_per_day = min(int(payload.get('meals_per_day') or 3), len(MEAL_TYPES))
+    plan = []
+    for day in range(int(payload.get('duration') or 1) * 30):
+        meals = [{
+            'name': random.choice(meal_names),
+            'portions': random.choice([1, 1.5, 2]),
+            'meal_type': meal_type,
+        } for meal_type in MEAL_TYPES[:meals_per_day]]
+        plan.append({
+            'date': str(start + timedelta(days=day)),
+            'total_calories': payload.get('max_calories', 0),
+            'meals': meals,
+        })
+    return plan
+
+
+class Command(BaseCommand):
+    help = "Lokalny generator planów MealAI do testów bez serwera FastAPI."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=9000)
+        parser.add_argument('--delay', type=float, default=1.0, help="Opóźnienie callbacku w sekundach.")
+        parser.add_argument('--fail-rate', type=float, default=0.0, help="Część żądań kończona błędem 503.")
+
+    def handle(self, *args, **options):
+        meal_names = list(Meal.objects.values_list('name', flat=True)) or ['Owsianka']
+        stdout = self.stdout
+
+        def send_callback(payload):
+            time.sleep(options['delay'])
+            body = {
+                'user_id': payload['user'],
+                'user_diet': payload['user_diet'],
+                'diet_plan': build_plan(payload, meal_names),
+            }
+            try:
+                response = requests.post(payload['callback_url'], json=body, timeout=30)
+                stdout.write(f"Callback for user_diet {payload['user_diet']}: {response.status_code}")
+            except requests.exceptions.RequestException as e:
+                stdout.write(f"Callback for user_diet {payload['user_diet']} failed: {e}")
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if random.random() < options['fail_rate']:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                threading.Thread(target=send_callback, args=(payload,), daemon=True).start()
+
+                body = json.dumps({'status': 'accepted'}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                stdout.write(format % args)
+
+        server = ThreadingHTTPServer((options['host'], options['port']), Handler)
+        self.stdout.write(f"MealAI stub listening on http://{options['host']}:{options['port']}/generate-diet/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
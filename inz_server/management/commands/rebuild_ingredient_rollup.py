@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from inz_server.models import DietDay, DietDayIngredient
+
+
+class Command(BaseCommand):
+    help = "Przelicza od nowa dzienne sumy składników (DietDayIngredient) dla wszystkich dni diet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        day_ids = list(DietDay.objects.order_by('id').values_list('id', flat=True))
+        batch_size = options['batch_size']
+        for start in range(0, len(day_ids), batch_size):
+            DietDayIngredient.refresh_for_days(day_ids[start:start + batch_size])
+        self.stdout.write(f"Przeliczono {len(day_ids)} dni.")
@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from inz_server.database import REPLICA_DB, replica_configured
+
+
+class Command(BaseCommand):
+    help = ("Kopiuje bazę główną do repliki SQLite (DB_REPLICA_NAME) przez backup API SQLite - "
+            "bez zatrzymywania serwera. Uruchamiany okresowo, np. z crona.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=1024,
+                            help="Liczba stron kopiowanych w jednym kroku (między krokami zapisy nie czekają).")
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError("Replika nie jest skonfigurowana (DB_REPLICA_NAME).")
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[REPLICA_DB]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("Kopiowanie obsługuje tylko SQLite -> SQLite; replikę PostgreSQL utrzymuje serwer bazy.")
+
+        primary.ensure_connection()
+        # Osobne połączenie - połączenie Django z repliką jest tylko do odczytu (query_only)
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            primary.connection.backup(target, pages=options['pages'])
+        finally:
+            target.close()
+        self.stdout.write(f"Skopiowano bazę do repliki: {replica.settings_dict['NAME']}")
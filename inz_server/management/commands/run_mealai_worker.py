@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from inz_server.mealai import run_worker
+
+
+class Command(BaseCommand):
+    help = "Wysyła zadania z kolejki MealAIJob do generatora planów diety."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help="Zakończ, gdy kolejka jest pusta.")
+
+    def handle(self, *args, **options):
+        run_worker(workers=options['workers'], poll_interval=options['poll_interval'], once=options['once'],
+                   stdout=self.stdout)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from inz_server.outbox import run_sender
+
+
+class Command(BaseCommand):
+    help = "Wysyła wiadomości z kolejki OutgoingEmail partiami, jednym połączeniem SMTP na partię."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--poll-interval', type=float, default=5.0)
+        parser.add_argument('--once', action='store_true', help="Zakończ, gdy kolejka jest pusta.")
+
+    def handle(self, *args, **options):
+        run_sender(poll_interval=options['poll_interval'], batch_size=options['batch_size'], once=options['once'],
+                   stdout=self.stdout)
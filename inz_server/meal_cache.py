@@ -0,0 +1,67 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Meal
+
+MEAL_FIELDS = [
+    'id', 'name', 'short_description', 'long_description', 'preparation_time', 'calories', 'calories_per_100g',
+    'default_grams', 'protein', 'fats', 'carbohydrates', 'image_url', 'lactose', 'nut', 'soy', 'gluten', 'fish',
+]
+VERSION_KEY = 'meal_catalog_version'
+
+MealRecord = namedtuple('MealRecord', MEAL_FIELDS)
+
+
+class MealCatalog:
+    """
+    Podręczny katalog posiłków w pamięci procesu (LRU, MEAL_CACHE_SIZE wpisów).
+    Wpisy są ważne tylko dla wersji katalogu, którą podbijają sygnały zapisu/usunięcia Meal.
+    Wersja leży we współdzielonym cache Django (CACHES), więc obejmuje wszystkie procesy;
+    niezależnie od wersji wpis wygasa po MEAL_CACHE_TTL sekund.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = OrderedDict()
+
+    # Wersja to losowy token, żeby wyrzucenie klucza z cache nie przywróciło starej wersji
+    def version(self):
+        return cache.get_or_set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    def bump(self):
+        cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+    def get_many(self, meal_ids):
+        version = self.version()
+        expired = time.monotonic() - settings.MEAL_CACHE_TTL
+        found = {}
+        with self.lock:
+            for meal_id in meal_ids:
+                entry = self.records.get(meal_id)
+                if entry is not None and entry[0] == version and entry[1] > expired:
+                    self.records.move_to_end(meal_id)
+                    found[meal_id] = entry[2]
+
+        missing = set(meal_ids) - found.keys()
+        if missing:
+            fetched = {row[0]: MealRecord(*row) for row in Meal.objects.filter(id__in=missing).values_list(*MEAL_FIELDS)}
+            found.update(fetched)
+            fetched_at = time.monotonic()
+            with self.lock:
+                for meal_id, record in fetched.items():
+                    self.records[meal_id] = (version, fetched_at, record)
+                    self.records.move_to_end(meal_id)
+                while len(self.records) > settings.MEAL_CACHE_SIZE:
+                    self.records.popitem(last=False)
+        return found
+
+    def get(self, meal_id):
+        return self.get_many([meal_id]).get(meal_id)
+
+
+meal_catalog = MealCatalog()
@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from . import job_queue
+from .models import MealAIJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_generation(user_diet, payload):
+    payload = dict(payload, callback_url=settings.MEALAI['CALLBACK_URL'])
+    return MealAIJob.objects.create(user_diet=user_diet, payload=payload)
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Po `threshold` kolejnych błędach przestaje wysyłać żądania na `reset_timeout` sekund,
+    a potem przepuszcza jedno próbne żądanie (half-open).
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def is_open(self):
+        # Otwarty także w trakcie próbnego żądania - kolejne czekają na jego wynik
+        return self.opened_at is not None and (
+            self.probing or time.monotonic() - self.opened_at < self.reset_timeout)
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if self.is_open():
+                raise CircuitOpen(f"Generator MealAI niedostępny ({self.failures} błędów z rzędu).")
+            self.probing = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    def retry_after(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+            return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0)
+
+
+class MealAIClient:
+    def __init__(self, pool_size):
+        options = settings.MEALAI
+        self.url = options['URL']
+        self.timeout = (options['CONNECT_TIMEOUT'], options['READ_TIMEOUT'])
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.breaker = CircuitBreaker(options['BREAKER_THRESHOLD'], options['BREAKER_RESET_TIMEOUT'])
+
+    def send(self, payload):
+        self.breaker.before_call()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return response
+
+
+def process_job(job_id, client):
+    close_old_connections()
+    try:
+        job = MealAIJob.objects.get(id=job_id)
+        try:
+            client.send(job.payload)
+        except CircuitOpen as e:
+            # Próba nie jest liczona - generator w ogóle nie dostał żądania. Minimalne opóźnienie,
+            # bo w trakcie próbnego żądania retry_after() wynosi 0
+            delay = max(client.breaker.retry_after(), settings.MEALAI['BACKOFF_BASE'])
+            MealAIJob.objects.filter(id=job.id).update(
+                status=MealAIJob.QUEUED, locked_at=None, attempts=F('attempts') - 1, last_error=str(e),
+                next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            )
+            return MealAIJob.QUEUED
+        except requests.exceptions.RequestException as e:
+            return job_queue.record_failure(job, e, settings.MEALAI)
+
+        MealAIJob.objects.filter(id=job.id).update(status=MealAIJob.DONE, locked_at=None, last_error='')
+        return MealAIJob.DONE
+    finally:
+        connection.close()
+
+
+def run_worker(workers=4, poll_interval=1.0, once=False, stdout=None):
+    """
+    Pętla workera: pobiera gotowe zadania z kolejki i wysyła je pulą `workers` wątków.
+    Z `once=True` kończy pracę, gdy w kolejce nie ma już zadań do wysłania.
+    """
+    client = MealAIClient(pool_size=workers)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='mealai') as executor:
+        while True:
+            job_queue.requeue_stale(MealAIJob, MealAIJob.RUNNING, settings.MEALAI)
+            free_slots = workers - len(running)
+            # Przy otwartym obwodzie zadania zostają w kolejce, zamiast krążyć między kolejką a workerem
+            if free_slots and not client.breaker.is_open():
+                for job_id in job_queue.claim(MealAIJob, MealAIJob.RUNNING, free_slots):
+                    running[executor.submit(process_job, job_id, client)] = job_id
+
+            if not running:
+                if once:
+                    break
+                close_old_connections()
+                time.sleep(poll_interval)
+                continue
+
+            done, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    # Np. błąd bazy - zadanie wróci do kolejki po LEASE_TIMEOUT, worker działa dalej
+                    logger.exception("MealAIJob %s: unexpected error", job_id)
+                    continue
+                if stdout:
+                    stdout.write(f"Job finished with status: {result}")
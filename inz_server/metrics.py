@@ -0,0 +1,332 @@
+import fcntl
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HISTOGRAMS = {
+    'fitter_http_request_duration_seconds': ("Czas obsługi żądania", LATENCY_BUCKETS),
+    'fitter_http_db_queries': ("Liczba zapytań SQL na żądanie", QUERY_BUCKETS),
+    'fitter_http_response_size_bytes': ("Rozmiar odpowiedzi", SIZE_BUCKETS),
+}
+COUNTERS = {
+    'fitter_http_requests_total': "Liczba żądań",
+    'fitter_http_errors_total': "Liczba odpowiedzi 5xx i nieobsłużonych wyjątków",
+    'fitter_http_db_query_seconds_total': "Łączny czas zapytań SQL",
+}
+
+# Stany zakończonych procesów są scalane do jednego pliku (liczniki nie mogą maleć)
+ARCHIVE_FILE = 'archive.json'
+PROCESS_FILE = re.compile(r'^(\d+)-[0-9a-f]+\.json$')
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+# Licznik bieżącego żądania - ContextVar, bo w widokach async zapytania idą z wątku sync_to_async
+current_counter = ContextVar('metrics_query_counter', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """execute_wrapper instalowany na każdym połączeniu (connection_created) - działa także przy DEBUG = False."""
+    counter = current_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter.count += 1
+        counter.duration += time.perf_counter() - started
+
+
+def install_query_counter(connection):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+class MetricsRegistry:
+    """
+    Liczniki i histogramy bieżącego procesu. Każdy proces co METRICS_FLUSH_INTERVAL sekund zapisuje
+    swój stan do osobnego pliku w METRICS_DIR, a endpoint /metrics sumuje wszystkie pliki,
+    więc wynik obejmuje wszystkie procesy workerów. Pliki procesów, które już nie działają,
+    są przy odczycie scalane do ARCHIVE_FILE - METRICS_DIR musi być lokalny dla maszyny.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.flushed_at = 0.0
+        # Id procesu + losowy sufiks, żeby nowy proces z tym samym pid nie nadpisał liczników poprzednika
+        self.process_key = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def directory(self):
+        return Path(settings.METRICS_DIR)
+
+    def observe(self, route, method, status, duration, queries, query_time, size, error):
+        labels = json.dumps([route, method])
+        with self.lock:
+            self.add_counter('fitter_http_requests_total', json.dumps([route, method, str(status)]), 1)
+            self.add_counter('fitter_http_db_query_seconds_total', labels, query_time)
+            if error:
+                self.add_counter('fitter_http_errors_total', labels, 1)
+            self.add_histogram('fitter_http_request_duration_seconds', labels, duration)
+            self.add_histogram('fitter_http_db_queries', labels, queries)
+            self.add_histogram('fitter_http_response_size_bytes', labels, size)
+        if time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_INTERVAL:
+            try:
+                self.flush()
+            except OSError:
+                # Brak miejsca/uprawnień do METRICS_DIR nie może psuć obsługi żądań
+                logger.exception("Nie udało się zapisać metryk do %s", settings.METRICS_DIR)
+
+    def add_counter(self, name, labels, value):
+        series = self.counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def add_histogram(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        series = self.histograms.setdefault(name, {})
+        # [liczniki kubełków (bez +Inf), suma, liczba obserwacji]
+        state = series.setdefault(labels, [[0] * len(buckets), 0, 0])
+        position = bisect_left(buckets, value)
+        if position < len(buckets):
+            state[0][position] += 1
+        state[1] += value
+        state[2] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps({'counters': self.counters, 'histograms': self.histograms}))
+
+    def flush(self):
+        self.flushed_at = time.monotonic()
+        directory = self.directory()
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{self.process_key}.json"
+        temporary = directory / f"{self.process_key}.{threading.get_ident()}.tmp"
+        temporary.write_text(json.dumps(self.snapshot()), encoding='utf-8')
+        os.replace(temporary, path)
+
+    def compact(self):
+        """Scala pliki zakończonych procesów do ARCHIVE_FILE i je usuwa."""
+        directory = self.directory()
+        with open(directory / 'compact.lock', 'w') as lock:
+            # Jeden scalający naraz - inaczej ten sam plik trafiłby do archiwum dwa razy
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead = [path for path in directory.glob('*.json')
+                    if path.name != f"{self.process_key}.json" and not process_alive(path.name)]
+            if not dead:
+                return
+            archive_path = directory / ARCHIVE_FILE
+            archive = read_state(archive_path) or {'counters': {}, 'histograms': {}, 'merged': []}
+            # Klucze procesów już scalonych, których pliki nie zostały usunięte (przerwane scalanie)
+            merged = {path.stem for path in dead} & set(archive['merged'])
+            for path in dead:
+                state = read_state(path)
+                if state is not None and path.stem not in merged:
+                    merge_state(archive, state)
+                    merged.add(path.stem)
+            archive['merged'] = sorted(merged)
+            temporary = directory / f"{ARCHIVE_FILE}.{self.process_key}.tmp"
+            temporary.write_text(json.dumps(archive), encoding='utf-8')
+            os.replace(temporary, archive_path)
+            for path in dead:
+                if path.stem in merged:
+                    path.unlink(missing_ok=True)
+
+    def collect(self):
+        """Sumuje stany wszystkich procesów (łącznie z zakończonymi - liczniki nie mogą maleć)."""
+        self.flush()
+        self.compact()
+        total = {'counters': {}, 'histograms': {}}
+        for path in self.directory().glob('*.json'):
+            state = read_state(path)
+            # None: plik w trakcie zapisu przez inny proces albo uszkodzony - pomijamy w tym odczycie
+            if state is not None:
+                merge_state(total, state)
+        return total['counters'], total['histograms']
+
+
+def process_alive(file_name):
+    match = PROCESS_FILE.match(file_name)
+    if match is None:
+        return True
+    try:
+        os.kill(int(match.group(1)), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_state(path):
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def merge_state(total, state):
+    for name, series in state['counters'].items():
+        merged = total['counters'].setdefault(name, {})
+        for labels, value in series.items():
+            merged[labels] = merged.get(labels, 0) + value
+    for name, series in state['histograms'].items():
+        merged = total['histograms'].setdefault(name, {})
+        for labels, (buckets, total_value, count) in series.items():
+            current = merged.setdefault(labels, [[0] * len(buckets), 0, 0])
+            current[0] = [a + b for a, b in zip(current[0], buckets)]
+            current[1] += total_value
+            current[2] += count
+
+
+def format_labels(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+def render_prometheus(counters, histograms):
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        names = ('route', 'method', 'status') if name == 'fitter_http_requests_total' else ('route', 'method')
+        for labels, value in sorted(counters.get(name, {}).items()):
+            lines.append(f"{name}{{{format_labels(names, json.loads(labels))}}} {value}")
+
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, (buckets, total, count) in sorted(histograms.get(name, {}).items()):
+            label_text = format_labels(('route', 'method'), json.loads(labels))
+            cumulative = 0
+            for bound, bucket in zip(bounds, buckets):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f"{name}_sum{{{label_text}}} {total}")
+            lines.append(f"{name}_count{{{label_text}}} {count}")
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def stream_chunks(content, counter, finish):
+    """Przepuszcza treść strumienia, licząc jej bajty i zapytania wykonane przy generowaniu kolejnych części."""
+    size = 0
+    try:
+        iterator = iter(content)
+        while True:
+            token = current_counter.set(counter)
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                current_counter.reset(token)
+            size += len(chunk)
+            yield chunk
+    finally:
+        finish(size)
+
+
+async def astream_chunks(content, counter, finish):
+    size = 0
+    try:
+        iterator = aiter(content)
+        while True:
+            token = current_counter.set(counter)
+            try:
+                chunk = await anext(iterator)
+            except StopAsyncIteration:
+                return
+            finally:
+                current_counter.reset(token)
+            size += len(chunk)
+            yield chunk
+    finally:
+        finish(size)
+
+
+class RequestMetricsMiddleware:
+    """
+    Mierzy czas, liczbę i czas zapytań SQL oraz rozmiar odpowiedzi, z podziałem na nazwę trasy z urls.py.
+    Treść odpowiedzi strumieniowej powstaje dopiero przy wysyłce, więc jej pomiar kończy się
+    razem ze strumieniem - czas obejmuje całą wysyłkę, a zapytania także te z generatora treści.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        token = current_counter.set(counter)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            current_counter.reset(token)
+            self.finish(request, response, counter, started)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        token = current_counter.set(counter)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_counter.reset(token)
+            self.finish(request, response, counter, started)
+        return response
+
+    def finish(self, request, response, counter, started):
+        if response is None or not response.streaming:
+            size = len(response.content) if response is not None else 0
+            self.observe(request, response, counter, time.perf_counter() - started, size)
+            return
+
+        def finish_stream(size):
+            self.observe(request, response, counter, time.perf_counter() - started, size)
+
+        if response.is_async:
+            response.streaming_content = astream_chunks(response.streaming_content, counter, finish_stream)
+        else:
+            response.streaming_content = stream_chunks(response.streaming_content, counter, finish_stream)
+
+    @staticmethod
+    def observe(request, response, counter, duration, size):
+        # response None = nieobsłużony wyjątek
+        status = response.status_code if response is not None else 500
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'unmatched'
+        registry.observe(route, request.method, status, duration, counter.count, counter.duration, size,
+                         status >= 500)
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inz_server', '0023_userdiet_weight'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dietday',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userdiet',
+            name='plan_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.5 on 2026-10-18 15:00
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_rollup(apps, schema_editor):
+    DietMeal = apps.get_model('inz_server', 'DietMeal')
+    MealIngredient = apps.get_model('inz_server', 'MealIngredient')
+    DietDayIngredient = apps.get_model('inz_server', 'DietDayIngredient')
+
+    recipes = defaultdict(list)
+    for meal_id, ingredient_id, quantity in MealIngredient.objects.values_list('meal_id', 'ingredient_id', 'quantity'):
+        recipes[meal_id].append((ingredient_id, quantity))
+
+    totals = defaultdict(Decimal)
+    diet_meals = DietMeal.objects.values_list('diet_day_id', 'diet_day__user_diet_id', 'diet_day__date', 'meal_id',
+                                              'quantity')
+    for diet_day_id, user_diet_id, date, meal_id, quantity in diet_meals.iterator():
+        for ingredient_id, ingredient_quantity in recipes[meal_id]:
+            totals[(diet_day_id, user_diet_id, date, ingredient_id)] += ingredient_quantity * quantity / 100
+
+    DietDayIngredient.objects.bulk_create([
+        DietDayIngredient(diet_day_id=diet_day_id, user_diet_id=user_diet_id, date=date, ingredient_id=ingredient_id,
+                          quantity=quantity)
+        for (diet_day_id, user_diet_id, date, ingredient_id), quantity in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inz_server', '0025_mealaijob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DietDayIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('diet_day', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inz_server.dietday')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inz_server.ingredient')),
+                ('user_diet', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inz_server.userdiet')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_diet', 'date'], name='inz_server__user_di_d45f20_idx')],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.5 on 2026-10-18 15:01
+
+from collections import defaultdict
+
+from django.db import migrations
+
+from inz_server.search import MEAL_FTS_TABLE, fold_text
+
+
+def create_meal_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Meal = apps.get_model('inz_server', 'Meal')
+    MealIngredient = apps.get_model('inz_server', 'MealIngredient')
+
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE {MEAL_FTS_TABLE} USING fts5("
+        f"name, ingredients, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+    ingredients = defaultdict(list)
+    for meal_id, name in MealIngredient.objects.values_list('meal_id', 'ingredient__name'):
+        ingredients[meal_id].append(name)
+    rows = [
+        (meal_id, fold_text(name), fold_text(' '.join(ingredients[meal_id])))
+        for meal_id, name in Meal.objects.values_list('id', 'name')
+    ]
+    with schema_editor.connection.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {MEAL_FTS_TABLE} (rowid, name, ingredients) VALUES (%s, %s, %s)", rows)
+
+
+def drop_meal_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {MEAL_FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inz_server', '0026_dietdayingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_meal_fts, drop_meal_fts),
+    ]
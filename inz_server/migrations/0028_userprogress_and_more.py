@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inz_server', '0027_meal_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProgress',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_trainings', models.PositiveIntegerField(default=0)),
+                ('weekly_trainings', models.JSONField(default=dict)),
+                ('latest_measurements', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trainingsession',
+            index=models.Index(fields=['user', '-date'], name='inz_server__user_id_38b859_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.5 on 2026-10-18 15:15
+
+from django.db import migrations, models
+
+
+def backfill_email_verified(apps, schema_editor):
+    CustomUser = apps.get_model('inz_server', 'CustomUser')
+    EmailVerificationToken = apps.get_model('inz_server', 'EmailVerificationToken')
+    verified = EmailVerificationToken.objects.filter(verified=True).values('user_id')
+    CustomUser.objects.filter(id__in=verified).update(email_verified=True)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inz_server', '0028_userprogress_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='email_verified',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(backfill_email_verified, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.5 on 2026-10-18 15:27
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+import uuid
+
+
+def merge_duplicate_diet_days(apps, schema_editor):
+    # Kanoniczny jest dzień o najmniejszym id (tak wybiera go zapis edytora i callback MealAI);
+    # posiłki i sumy składników z duplikatów przechodzą na niego, żeby nic nie zniknęło z planu
+    UserDiet = apps.get_model('inz_server', 'UserDiet')
+    DietDay = apps.get_model('inz_server', 'DietDay')
+    DietMeal = apps.get_model('inz_server', 'DietMeal')
+    DietDayIngredient = apps.get_model('inz_server', 'DietDayIngredient')
+    duplicates = DietDay.objects.values('user_diet_id', 'date').annotate(keep_id=Min('id'), days=Count('id')) \
+        .filter(days__gt=1)
+    kept_days = {}
+    for duplicate in duplicates:
+        extra_ids = DietDay.objects.filter(user_diet_id=duplicate['user_diet_id'], date=duplicate['date']) \
+            .exclude(id=duplicate['keep_id']).values_list('id', flat=True)
+        DietMeal.objects.filter(diet_day_id__in=extra_ids).update(diet_day_id=duplicate['keep_id'])
+        DietDayIngredient.objects.filter(diet_day_id__in=extra_ids).update(diet_day_id=duplicate['keep_id'])
+        DietDay.objects.filter(id__in=extra_ids).delete()
+        kept_days.setdefault(duplicate['user_diet_id'], []).append(duplicate['keep_id'])
+
+    # Jak UserDiet.mark_days_changed - synchronizacja delta edytora musi zobaczyć przeniesione posiłki
+    for user_diet_id, day_ids in kept_days.items():
+        UserDiet.objects.filter(id=user_diet_id).update(plan_version=F('plan_version') + 1)
+        plan_version = UserDiet.objects.values_list('plan_version', flat=True).get(id=user_diet_id)
+        DietDay.objects.filter(id__in=day_ids).update(version=plan_version)
+
+
+def merge_duplicate_measurements(apps, schema_editor):
+    # Zostaje najstarszy pomiar z danego dnia, puste obwody uzupełniane są z późniejszych
+    BodyMeasurement = apps.get_model('inz_server', 'BodyMeasurement')
+    UserProgress = apps.get_model('inz_server', 'UserProgress')
+    duplicates = BodyMeasurement.objects.values('user_id', 'date').annotate(days=Count('id')).filter(days__gt=1)
+    user_ids = set()
+    for duplicate in duplicates:
+        measurements = list(BodyMeasurement.objects.filter(user_id=duplicate['user_id'], date=duplicate['date'])
+                            .order_by('id'))
+        kept = measurements[0]
+        for measurement in measurements[1:]:
+            for field in ('waist', 'chest', 'bicep', 'thigh'):
+                if getattr(kept, field) is None:
+                    setattr(kept, field, getattr(measurement, field))
+        kept.save()
+        BodyMeasurement.objects.filter(id__in=[measurement.id for measurement in measurements[1:]]).delete()
+        user_ids.add(duplicate['user_id'])
+    # Podsumowanie postępu zawiera listę pomiarów - przeliczy się przy następnym odczycie
+    UserProgress.objects.filter(user_id__in=user_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inz_server', '0030_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_diet_days, migrations.RunPython.noop),
+        migrations.RunPython(merge_duplicate_measurements, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='emailverificationtoken',
+            name='token',
+            field=models.UUIDField(default=uuid.uuid4, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='dietmeal',
+            index=models.Index(fields=['diet_day', 'meal_type'], name='inz_server__diet_da_fb0281_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['name'], name='inz_server__name_815440_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userdiet',
+            index=models.Index(fields=['user', '-data_rozpoczecia'], name='inz_server__user_id_449bdc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='zamowienie',
+            index=models.Index(fields=['uzytkownik', '-data_rozpoczecia'], name='inz_server__uzytkow_8452fb_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bodymeasurement',
+            constraint=models.UniqueConstraint(fields=('user', 'date'), name='unique_body_measurement_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='dietday',
+            constraint=models.UniqueConstraint(fields=('user_diet', 'date'), name='unique_diet_day_date'),
+        ),
+    ]
@@ -1,11 +1,14 @@
 import uuid
+from collections import defaultdict
 from datetime import timedelta
+from decimal import Decimal
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.models import User
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 
 
@@ -14,6 +17,7 @@ class CustomUser(AbstractUser):
     city = models.CharField(max_length=255, null=True, blank=True)
     zipCode = models.CharField(max_length=255, null=True, blank=True)
     country = models.CharField(max_length=255, null=True, blank=True)
+    email_verified = models.BooleanField(default=False)
 
     def __str__(self):
         return self.username
@@ -25,7 +29,7 @@ def default_expires_at():
 
 class EmailVerificationToken(models.Model):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
-    token = models.UUIDField(default=uuid.uuid4)
+    token = models.UUIDField(default=uuid.uuid4, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     expires_at = models.DateTimeField(default=default_expires_at)
@@ -64,6 +68,11 @@ class Meal(models.Model):
     gluten = models.BooleanField(default=False)
     fish = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -111,10 +120,25 @@ class UserDiet(models.Model):
     weight = models.FloatField(default=0)
     height = models.IntegerField(default=0)
     activity_level = models.CharField(max_length=50, default='medium')
+    plan_version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-data_rozpoczecia']),
+        ]
 
     def __str__(self):
         return f"{self.user.id}-{self.user.username} - {self.dieta.nazwa}"
 
+    def mark_days_changed(self, diet_day_ids):
+        # Podbija wersję planu i oznacza nią zmienione dni (synchronizacja delta edytora)
+        with transaction.atomic():
+            UserDiet.objects.filter(pk=self.pk).update(plan_version=F('plan_version') + 1)
+            self.refresh_from_db(fields=['plan_version'])
+            DietDay.objects.filter(pk__in=diet_day_ids).update(version=self.plan_version)
+            DietDayIngredient.refresh_for_days(diet_day_ids)
+        return self.plan_version
+
     def get_preferences_by_value(self, value):
         return [pref for pref, status in self.food_preferences.items() if status == value]
 
@@ -143,6 +167,11 @@ class DietMeal(models.Model):
     quantity = models.IntegerField(default=0)
     unit = models.CharField(max_length=3, choices=MeasurementUnit.choices, default=MeasurementUnit.GRAMS)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['diet_day', 'meal_type']),
+        ]
+
     def __str__(self):
         return f"{self.meal.name} - {self.meal_type} - {self.uuid}"
 
@@ -151,11 +180,64 @@ class DietDay(models.Model):
     user_diet = models.ForeignKey(UserDiet, on_delete=models.CASCADE)
     date = models.DateField()
     meals = models.ManyToManyField(Meal, through=DietMeal)
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Jeden dzień na datę w diecie - unikalny indeks obsługuje też zapytania o zakres dat
+            models.UniqueConstraint(fields=['user_diet', 'date'], name='unique_diet_day_date'),
+        ]
 
     def __str__(self):
         return f"{self.user_diet.user.username} - {self.date}"
 
 
+class DietDayIngredient(models.Model):
+    """Suma składników posiłków jednego dnia diety - źródło list zakupów."""
+    diet_day = models.ForeignKey(DietDay, on_delete=models.CASCADE)
+    user_diet = models.ForeignKey(UserDiet, on_delete=models.CASCADE)
+    date = models.DateField()
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE)
+    quantity = models.DecimalField(max_digits=12, decimal_places=4)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user_diet', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient.name} - {self.quantity} - {self.date}"
+
+    @classmethod
+    def refresh_for_days(cls, diet_day_ids):
+        diet_day_ids = list(diet_day_ids)
+        diet_meals = list(DietMeal.objects.filter(diet_day_id__in=diet_day_ids).values_list(
+            'diet_day_id', 'diet_day__user_diet_id', 'diet_day__date', 'meal_id', 'quantity'))
+
+        recipes = defaultdict(list)
+        meal_ingredients = MealIngredient.objects.filter(meal_id__in={row[3] for row in diet_meals}) \
+            .values_list('meal_id', 'ingredient_id', 'quantity')
+        for meal_id, ingredient_id, quantity in meal_ingredients:
+            recipes[meal_id].append((ingredient_id, quantity))
+
+        totals = defaultdict(Decimal)
+        for diet_day_id, user_diet_id, date, meal_id, quantity in diet_meals:
+            for ingredient_id, ingredient_quantity in recipes[meal_id]:
+                totals[(diet_day_id, user_diet_id, date, ingredient_id)] += ingredient_quantity * quantity / 100
+
+        with transaction.atomic():
+            cls.objects.filter(diet_day_id__in=diet_day_ids).delete()
+            cls.objects.bulk_create([
+                cls(diet_day_id=diet_day_id, user_diet_id=user_diet_id, date=date, ingredient_id=ingredient_id,
+                    quantity=quantity)
+                for (diet_day_id, user_diet_id, date, ingredient_id), quantity in totals.items()
+            ])
+
+    @classmethod
+    def refresh_for_meal(cls, meal_id):
+        cls.refresh_for_days(DietMeal.objects.filter(meal_id=meal_id).values_list('diet_day_id', flat=True).distinct())
+
+
 class Zamowienie(models.Model):
     uzytkownik = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     dieta = models.ForeignKey('Dieta', on_delete=models.CASCADE, null=True, blank=True)
@@ -173,6 +255,11 @@ class Zamowienie(models.Model):
     ]
     status = models.CharField(max_length=100, choices=STATUS_CHOICES, default='pending')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['uzytkownik', '-data_rozpoczecia']),
+        ]
+
     def __str__(self):
         return f"Zamowienie {self.id} - Uzytkownik: {self.uzytkownik.username} - Dieta: {self.dieta.nazwa if self.dieta else 'Brak'}"
 
@@ -185,6 +272,11 @@ class TrainingSession(models.Model):
     date = models.DateTimeField()
     notes = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-date']),
+        ]
+
     def __str__(self):
         return f"{self.user}'s training session on {self.date}"
 
@@ -214,6 +306,11 @@ class BodyMeasurement(models.Model):
     bicep = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)  # Obwód bicepsa
     thigh = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)  # Obwód uda
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date'], name='unique_body_measurement_date'),
+        ]
+
     def __str__(self):
         return f"Measurements for {self.user} on {self.date}"
 
@@ -224,3 +321,82 @@ class Exercise2(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class MealAIJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    user_diet = models.ForeignKey(UserDiet, on_delete=models.CASCADE)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"MealAIJob {self.id} - {self.status} - UserDiet {self.user_diet_id}"
+
+
+class UserProgress(models.Model):
+    """Statystyki panelu postępów, aktualizowane przy zapisie treningów i pomiarów (progress.py)."""
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='progress')
+    total_trainings = models.PositiveIntegerField(default=0)
+    # Liczba treningów w tygodniu ISO, np. {"2024-W07": 3}
+    weekly_trainings = models.JSONField(default=dict)
+    latest_measurements = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.total_trainings} treningów"
+
+
+class OutgoingEmail(models.Model):
+    """Wiadomość czekająca na wysłanie - kolejkę opróżnia `manage.py send_outbox` (outbox.py)."""
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"OutgoingEmail {self.id} - {self.status} - {', '.join(self.to)}"
@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import job_queue
+from .models import OutgoingEmail
+
+
+def queue_email(subject, body, from_email, recipient_list, html_message=None):
+    """
+    Odpowiednik send_mail, który tylko zapisuje wiadomość w kolejce. Wywołany w transakcji
+    razem z danymi, których dotyczy - mail wyjdzie dopiero po jej zatwierdzeniu.
+    """
+    return OutgoingEmail.objects.create(subject=subject, body=body, html_body=html_message or '',
+                                        from_email=from_email, to=list(recipient_list))
+
+
+def send_batch(limit=None):
+    """Wysyła jedną partię wiadomości przez jedno połączenie z EMAIL_BACKEND. Zwraca {status: liczba}."""
+    email_ids = job_queue.claim(OutgoingEmail, OutgoingEmail.SENDING, limit or settings.OUTBOX['BATCH_SIZE'])
+    results = {}
+    if not email_ids:
+        return results
+
+    emails = list(OutgoingEmail.objects.filter(id__in=email_ids).order_by('id'))
+    mail_connection = get_connection(fail_silently=False)
+    try:
+        mail_connection.open()
+    except Exception as e:
+        # Serwer SMTP niedostępny - cała partia wraca do kolejki z opóźnieniem
+        for email in emails:
+            status = job_queue.record_failure(email, e, settings.OUTBOX)
+            results[status] = results.get(status, 0) + 1
+        return results
+
+    try:
+        for email in emails:
+            message = EmailMultiAlternatives(email.subject, email.body, email.from_email, email.to,
+                                             connection=mail_connection)
+            if email.html_body:
+                message.attach_alternative(email.html_body, 'text/html')
+            try:
+                message.send()
+            except Exception as e:
+                status = job_queue.record_failure(email, e, settings.OUTBOX)
+            else:
+                OutgoingEmail.objects.filter(id=email.id).update(status=OutgoingEmail.SENT, locked_at=None,
+                                                                 last_error='', sent_at=timezone.now())
+                status = OutgoingEmail.SENT
+            results[status] = results.get(status, 0) + 1
+    finally:
+        mail_connection.close()
+    return results
+
+
+def run_sender(poll_interval=5.0, batch_size=None, once=False, stdout=None):
+    """Pętla sendera. Z `once=True` kończy pracę, gdy w kolejce nie ma już wiadomości do wysłania."""
+    while True:
+        job_queue.requeue_stale(OutgoingEmail, OutgoingEmail.SENDING, settings.OUTBOX)
+        results = send_batch(batch_size)
+        if results and stdout:
+            stdout.write(', '.join(f"{status}: {count}" for status, count in sorted(results.items())))
+        if not results:
+            if once:
+                break
+            close_old_connections()
+            time.sleep(poll_interval)
@@ -0,0 +1,64 @@
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BodyMeasurement, TrainingSession, UserProgress
+from .serializers import BodyMeasurementSerializer
+
+# Panel pokazuje tylko ostatnie pomiary - pełna historia jest w /measurements/
+PROGRESS_MEASUREMENTS = 30
+
+
+def week_key(date):
+    year, week, _ = timezone.localtime(date).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def latest_measurements(user_id):
+    measurements = BodyMeasurement.objects.filter(user_id=user_id).order_by('-date')[:PROGRESS_MEASUREMENTS]
+    return BodyMeasurementSerializer(reversed(list(measurements)), many=True).data
+
+
+def rebuild_progress(user_id):
+    """Przelicza statystyki użytkownika od zera (brak rekordu, edycja daty treningu, dane wgrane hurtowo)."""
+    dates = TrainingSession.objects.filter(user_id=user_id).values_list('date', flat=True)
+    weekly = Counter(week_key(date) for date in dates)
+    progress, _ = UserProgress.objects.update_or_create(user_id=user_id, defaults={
+        'total_trainings': sum(weekly.values()),
+        'weekly_trainings': dict(weekly),
+        'latest_measurements': latest_measurements(user_id),
+    })
+    return progress
+
+
+def get_progress(user):
+    try:
+        return UserProgress.objects.get(user=user)
+    except UserProgress.DoesNotExist:
+        return rebuild_progress(user.id)
+
+
+def record_training(user_id, date, delta):
+    """Dolicza (delta=1) lub odejmuje (delta=-1) trening z podanej daty."""
+    with transaction.atomic():
+        progress = UserProgress.objects.select_for_update().filter(user_id=user_id).first()
+        if progress is None:
+            # Przy usuwaniu (np. kaskadowo razem z użytkownikiem) nie zakładamy nowego rekordu
+            if delta > 0:
+                rebuild_progress(user_id)
+            return
+        key = week_key(date)
+        count = progress.weekly_trainings.get(key, 0) + delta
+        if count > 0:
+            progress.weekly_trainings[key] = count
+        else:
+            progress.weekly_trainings.pop(key, None)
+        progress.total_trainings = max(progress.total_trainings + delta, 0)
+        progress.save(update_fields=['total_trainings', 'weekly_trainings', 'updated_at'])
+
+
+def refresh_measurements(user_id):
+    UserProgress.objects.filter(user_id=user_id).update(
+        latest_measurements=latest_measurements(user_id), updated_at=timezone.now()
+    )
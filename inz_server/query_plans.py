@@ -0,0 +1,62 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .benchmarks import CASES, BenchmarkContext, request, reset_process_caches, response_size
+from .datasets import generate_dataset
+
+# Tabele, których pełny odczyt jest zamierzony
+ALLOWED_SCANS = {
+    'inz_server_dieta': "słownik kilku typów diet",
+    'inz_server_exercise2': "katalog ćwiczeń ładowany w całości do exercise_index",
+    'django_content_type': "panel admina",
+}
+# Trasy czytające całe tabele z definicji (listy dla administratora)
+ALLOWED_ROUTES = {
+    'admin': "panel admina",
+    'users-with-orders': "lista wszystkich zamówień dla administratora",
+    'profile-list': "lista wszystkich profili dla administratora",
+}
+
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+SCAN = re.compile(r'^SCAN (\w+)')
+
+
+def full_scans(sql):
+    """Tabele czytane w całości w planie zapytania (EXPLAIN QUERY PLAN SQLite)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        plan = [row[3] for row in cursor.fetchall()]
+    tables = []
+    for detail in plan:
+        match = SCAN.match(detail)
+        # Skan wirtualnej tabeli FTS5 to wyszukiwanie w indeksie pełnotekstowym
+        if match and 'VIRTUAL TABLE' not in detail:
+            tables.append((match.group(1), detail))
+    return tables
+
+
+def check_plans(params, seed=0, stdout=None):
+    """
+    Wywołuje każdy przypadek z CASES na wygenerowanym zbiorze i sprawdza plan każdego zapytania.
+    Zwraca listę (etykieta, tabela, szczegół planu, sql) dla niedozwolonych pełnych skanów.
+    """
+    reset_process_caches()
+    generate_dataset(seed=seed, **params)
+    context = BenchmarkContext(params['months'])
+
+    problems = []
+    for label, route, method, user, path, data in CASES:
+        with CaptureQueriesContext(connection) as queries:
+            # Odpowiedzi strumieniowe wykonują zapytania dopiero przy czytaniu treści
+            response_size(request(context, method, user, path(context), data(context) if data else None))
+        statements = {query['sql'] for query in queries if query['sql'].lstrip().upper().startswith(EXPLAINED_STATEMENTS)}
+        scans = [(table, detail, sql) for sql in sorted(statements) for table, detail in full_scans(sql)
+                 if table not in ALLOWED_SCANS]
+        if stdout:
+            state = 'pominięto' if label in ALLOWED_ROUTES else ('OK' if not scans else f'{len(scans)} skanów')
+            stdout.write(f"  {label:<36} {len(statements):>3} zapytań  {state}")
+        if label not in ALLOWED_ROUTES:
+            problems += [(label, table, detail, sql) for table, detail, sql in scans]
+    return problems
@@ -0,0 +1,43 @@
+"""
+Kodowanie JSON przez orjson. UUID, date i liczby są kodowane natywnie; Decimal, datetime, leniwe
+tłumaczenia i typy numpy przechodzą przez `default` tego samego kodera co dotąd (DRF albo Django),
+więc format wartości w odpowiedziach się nie zmienia - tylko JSON jest zwarty i w UTF-8.
+"""
+import orjson
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+drf_default = JSONEncoder().default
+django_default = DjangoJSONEncoder().default
+
+
+def dumps(data, default=drf_default):
+    content = orjson.dumps(data, default=default, option=OPTIONS)
+    # Jak JSONRenderer z DRF: U+2028/U+2029 escapowane, żeby JSON był poprawnym JavaScriptem
+    if b'\xe2\x80\xa8' in content or b'\xe2\x80\xa9' in content:
+        content = content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+    return content
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Wcięcia (Accept: application/json; indent=4, przeglądarkowe API) koduje biblioteka standardowa
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class ORJSONResponse(HttpResponse):
+    """Odpowiednik JsonResponse - datetime i Decimal formatowane jak przez DjangoJSONEncoder."""
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError('In order to allow non-dict objects to be serialized set the safe parameter to False.')
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data, default=django_default), **kwargs)
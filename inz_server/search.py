@@ -0,0 +1,77 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.db import connection
+
+from .models import Meal, MealIngredient
+
+MEAL_FTS_TABLE = 'inz_server_meal_fts'
+
+# Litery bez rozkładu kanonicznego w Unicode (NFKD nie zdejmie z nich znaku diakrytycznego)
+POLISH_LETTERS = str.maketrans('łŁ', 'lL')
+
+
+def fold_text(text):
+    text = unicodedata.normalize('NFKD', (text or '').translate(POLISH_LETTERS))
+    return ''.join(char for char in text if not unicodedata.combining(char)).lower()
+
+
+def tokenize(text):
+    return re.findall(r'\w+', fold_text(text))
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def index_meals(meal_ids):
+    """Odświeża wpisy indeksu pełnotekstowego dla podanych posiłków."""
+    if not fts_enabled():
+        return
+    meal_ids = list(meal_ids)
+    ingredients = defaultdict(list)
+    for meal_id, name in MealIngredient.objects.filter(meal_id__in=meal_ids).values_list('meal_id', 'ingredient__name'):
+        ingredients[meal_id].append(name)
+    rows = [
+        (meal_id, fold_text(name), fold_text(' '.join(ingredients[meal_id])))
+        for meal_id, name in Meal.objects.filter(id__in=meal_ids).values_list('id', 'name')
+    ]
+    with connection.cursor() as cursor:
+        for start in range(0, len(meal_ids), 500):
+            batch = meal_ids[start:start + 500]
+            cursor.execute(f"DELETE FROM {MEAL_FTS_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(batch))})", batch)
+        cursor.executemany(f"INSERT INTO {MEAL_FTS_TABLE} (rowid, name, ingredients) VALUES (%s, %s, %s)", rows)
+
+
+def remove_meal(meal_id):
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {MEAL_FTS_TABLE} WHERE rowid = %s", [meal_id])
+
+
+def search_meal_ids(query, limit=10):
+    """
+    Zwraca id posiłków pasujących do zapytania, od najlepiej dopasowanych. Każde słowo
+    zapytania jest dopasowywane jako prefiks, bez względu na polskie znaki i kolejność słów.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return list(Meal.objects.order_by('id').values_list('id', flat=True)[:limit])
+
+    if not fts_enabled():
+        meals = Meal.objects.all()
+        for token in tokens:
+            meals = meals.filter(name__icontains=token)
+        return list(meals.values_list('id', flat=True)[:limit])
+
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    with connection.cursor() as cursor:
+        # Trafienie w nazwie waży więcej niż trafienie w składnikach
+        cursor.execute(
+            f"SELECT rowid FROM {MEAL_FTS_TABLE} WHERE {MEAL_FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({MEAL_FTS_TABLE}, 10.0, 1.0) LIMIT %s",
+            [match, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
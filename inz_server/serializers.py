@@ -1,16 +1,21 @@
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from django.contrib.auth.models import update_last_login
+from django.db import transaction
+from django.db.models import Prefetch
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 
 from inz_server.models import Zamowienie, Dieta, BodyMeasurement, Ingredient, Exercise2
 from .models import EmailVerificationToken
 from .models import TrainingSession, Exercise, ExerciseSeries
+from .authentication import user_roles
 from .models import UserDiet
+from .outbox import queue_email
 
 
 class CustomAuthenticationFailed(AuthenticationFailed):
@@ -22,30 +27,37 @@ class EmailNotVerified(AuthenticationFailed):
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        # Dane konta podpisane w tokenie - /user-data/ nie musi już pytać bazy o role
+        token['username'] = user.username
+        token['email'] = user.email
+        token['email_verified'] = user.email_verified
+        token['roles'] = user_roles(user)
+        return token
+
     def validate(self, attrs):
-        # Czy dane uwierzytelniające są prawidłowe
+        # Czy dane uwierzytelniające są prawidłowe (TokenObtainSerializer.validate - bez wydawania tokenów)
         try:
-            data = super().validate(attrs)
+            super(TokenObtainPairSerializer, self).validate(attrs)
         except AuthenticationFailed:
             raise CustomAuthenticationFailed()
 
         # Czy e-mail jest zweryfikowany
-        try:
-            verification_token = EmailVerificationToken.objects.get(user=self.user, verified=True)
-        except EmailVerificationToken.DoesNotExist:
-            raise EmailNotVerified()
-
-        # Jeśli e-mail nie jest zweryfikowany, wyrzuć wyjątek EmailNotVerified
-        if not verification_token.verified:
+        if not self.user.email_verified:
             raise EmailNotVerified()
 
+        refresh = self.get_token(self.user)
+        if jwt_settings.UPDATE_LAST_LOGIN:
+            update_last_login(None, self.user)
 
-
-        user_groups = self.user.groups.all()
-        data['roles'] = [group.name for group in user_groups]
-        data['isVerified'] = verification_token.verified
-
-        return data
+        return {
+            'refresh': str(refresh),
+            'access': str(refresh.access_token),
+            'roles': refresh['roles'],
+            'isVerified': self.user.email_verified,
+        }
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -104,20 +116,19 @@ class UserSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        user = CustomUser.objects.create_user(**validated_data)
-
-        token = EmailVerificationToken.objects.create(user=user)
-        message_html = render_to_string('email_verification.html', {'token': token.token})
-
-        send_mail(
-            '[Fitter] Weryfikacja konta',
-            f'',
-            'twojemail@email.com',
-            [user.email],
-            html_message=message_html,
-
-            fail_silently=False,
-        )
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(**validated_data)
+
+            token = EmailVerificationToken.objects.create(user=user)
+            message_html = render_to_string('email_verification.html', {'token': token.token})
+
+            queue_email(
+                '[Fitter] Weryfikacja konta',
+                f'',
+                'twojemail@email.com',
+                [user.email],
+                html_message=message_html,
+            )
         return user
 
     def update(self, instance, validated_data):
@@ -211,6 +222,18 @@ class UserDietSerializer(serializers.ModelSerializer):
         return instance
 
 
+def create_exercises(training_session, exercises_data):
+    """Zapisuje ćwiczenia sesji razem z seriami - jeden INSERT na poziom zamiast jednego na wiersz."""
+    exercises = Exercise.objects.bulk_create([
+        Exercise(training_session=training_session, name=exercise_data['name']) for exercise_data in exercises_data
+    ])
+    ExerciseSeries.objects.bulk_create([
+        ExerciseSeries(exercise=exercise, **series)
+        for exercise, exercise_data in zip(exercises, exercises_data) for series in exercise_data['series']
+    ])
+    return exercises
+
+
 class ExerciseSeriesSerializer(serializers.ModelSerializer):
     class Meta:
         model = ExerciseSeries
@@ -225,10 +248,9 @@ class ExerciseSerializer(serializers.ModelSerializer):
         fields = ['name', 'series']
 
     def create(self, validated_data):
-        series_data = validated_data.pop('series')
-        exercise = Exercise.objects.create(**validated_data)
-        for series_datum in series_data:
-            ExerciseSeries.objects.create(exercise=exercise, **series_datum)
+        training_session = validated_data.pop('training_session')
+        with transaction.atomic():
+            exercise, = create_exercises(training_session, [validated_data])
         return exercise
 
 
@@ -239,18 +261,23 @@ class TrainingSessionSerializer(serializers.ModelSerializer):
         model = TrainingSession
         fields = ['id', 'date', 'notes', 'exercises']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # Ćwiczenia i serie dwoma zapytaniami dla całej strony sesji zamiast zapytania na sesję i na ćwiczenie
+        return queryset.prefetch_related(
+            Prefetch('exercises', queryset=Exercise.objects.order_by('id').prefetch_related(
+                Prefetch('series', queryset=ExerciseSeries.objects.order_by('id'))
+            ))
+        )
+
     def create(self, validated_data):
         user = self.context['request'].user
         exercises_data = validated_data.pop('exercises')
-        training_session = TrainingSession.objects.create(user=user, **validated_data)
-
-        for exercise_data in exercises_data:
-            series_data = exercise_data.pop('series')
-            exercise = Exercise.objects.create(training_session=training_session, **exercise_data)
-            for series in series_data:
-                ExerciseSeries.objects.create(exercise=exercise, **series)
+        with transaction.atomic():
+            training_session = TrainingSession.objects.create(user=user, **validated_data)
+            create_exercises(training_session, exercises_data)
 
-        return training_session
+        return self.setup_eager_loading(TrainingSession.objects.filter(pk=training_session.pk)).get()
 
     def update(self, instance, validated_data):
         return instance
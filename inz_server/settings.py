@@ -48,7 +48,11 @@ INSTALLED_APPS = [
 ]
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'inz_server.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'inz_server.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 }
 SIMPLE_JWT = {
@@ -62,6 +66,7 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 MIDDLEWARE = [
+    'inz_server.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -70,6 +75,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'inz_server.database.DatabaseRoutingMiddleware',
 
 ]
 CSRF_TRUSTED_ORIGINS = ['http://127.0.0.1:3000', 'http://192.168.1.114:3000', "http://192.168.1.114",'http://57.128.199.149', 'https://57.128.199.149','http://patchker.com','https://patchker.com', 'https://www.patchker.com']
@@ -91,6 +97,8 @@ LOGGING = {
 
 
 CORS_ALLOW_ALL_ORIGINS = True
+# Liczba wyników search_exercises jest w nagłówku - bez tego przeglądarka nie pokaże go frontendowi
+CORS_EXPOSE_HEADERS = ['X-Total-Count']
 '''
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -133,8 +141,51 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Połączenie utrzymywane między żądaniami (sekundy) i sprawdzane przed ponownym użyciem
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Replika do odczytu (opcjonalna) - drugi plik SQLite (np. odświeżany `manage.py refresh_replica`)
+# albo PostgreSQL z DB_REPLICA_ENGINE=django.db.backends.postgresql (wymaga pakietu psycopg)
+if config('DB_REPLICA_NAME', default=''):
+    DATABASES['replica'] = {
+        'ENGINE': config('DB_REPLICA_ENGINE', default='django.db.backends.sqlite3'),
+        'NAME': config('DB_REPLICA_NAME'),
+        'HOST': config('DB_REPLICA_HOST', default=''),
+        'PORT': config('DB_REPLICA_PORT', default=''),
+        'USER': config('DB_REPLICA_USER', default=''),
+        'PASSWORD': config('DB_REPLICA_PASSWORD', default=''),
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_ROUTERS = ['inz_server.database.ReplicaRouter']
+
+# Endpointy (nazwy tras z urls.py), których odczyty GET idą do repliki
+REPLICA_READ_ROUTES = {
+    'diet_plans', 'get_meal', 'search_meals', 'user-progress', 'body-measurements', 'body-measurement-series',
+    'exercise-progress', 'trainings', 'diet-ingredients', 'search_exercises', 'user_orders',
+}
+# Jak długo po zapisie użytkownik czyta z bazy głównej - powinno przekraczać opóźnienie repliki
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+# Pragmy ustawiane na każdym połączeniu SQLite (inz_server.database.apply_sqlite_pragmas)
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,           # ms oczekiwania na blokadę zapisu zamiast "database is locked"
+    'mmap_size': 268435456,         # 256 MB
+    'cache_size': -65536,           # 64 MB (wartość ujemna = KiB)
+    'temp_store': 'MEMORY',
 }
+# Tryb WAL zostaje zapisany w pliku bazy, więc tylko na życzenie (SQLITE_WAL=True na serwerze),
+# a nie przy każdym manage.py na bazie deweloperskiej z repozytorium
+SQLITE_WAL = config('SQLITE_WAL', default=False, cast=bool)
+if SQLITE_WAL:
+    SQLITE_PRAGMAS.update({
+        'journal_mode': 'WAL',      # odczyty nie blokują zapisu i odwrotnie
+        'synchronous': 'NORMAL',    # w trybie WAL bezpieczne przy awarii procesu
+    })
 
 
 # Password validation
@@ -179,6 +230,60 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Dni planu diety są tworzone dopiero przy pierwszym zapisie posiłku (zamiast 30 wierszy na miesiąc zamówienia)
+DIET_DAYS_LAZY = True
+
+# Co ile sekund indeks autouzupełniania ćwiczeń jest przebudowywany (zmiany z innych procesów)
+EXERCISE_INDEX_TTL = 300
+
+# Maksymalna liczba posiłków trzymanych w katalogu w pamięci procesu (meal_cache)
+MEAL_CACHE_SIZE = 5000
+# Po ilu sekundach wpis katalogu jest pobierany z bazy ponownie, nawet bez zmiany wersji
+MEAL_CACHE_TTL = 300
+
+# Cache Django współdzielony przez wszystkie procesy serwera (wersja katalogu posiłków, przypięcia do bazy głównej).
+# Domyślnie pliki w var/cache; przy kilku maszynach np. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'var', 'cache')),
+    }
+}
+
+# Generator planów MealAI - żądania trafiają do kolejki MealAIJob i wysyła je `manage.py run_mealai_worker`
+MEALAI = {
+    'URL': config('MEALAI_URL', default='http://localhost:9000/generate-diet/'),
+    'CALLBACK_URL': config('MEALAI_CALLBACK_URL', default='http://localhost:8000/works/fitter/api/mealAIResponse/'),
+    'CONNECT_TIMEOUT': 3,
+    'READ_TIMEOUT': 15,
+    'MAX_ATTEMPTS': 6,
+    'BACKOFF_BASE': 5,
+    'BACKOFF_MAX': 600,
+    'LEASE_TIMEOUT': 300,
+    'BREAKER_THRESHOLD': 5,
+    'BREAKER_RESET_TIMEOUT': 60,
+}
+
+# Podręczny cache użytkowników uwierzytelnianych tokenem JWT (inz_server.authentication)
+AUTH_USER_CACHE_TTL = 60
+AUTH_USER_CACHE_SIZE = 10000
+
+# Asynchroniczne wersje widoków do odczytu (async_views.py) - tylko pod serwerem ASGI (inz_server.asgi)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
+# Metryki żądań (/works/fitter/api/metrics/) - każdy proces zapisuje swój stan do METRICS_DIR
+METRICS_DIR = config('METRICS_DIR', default=os.path.join(BASE_DIR, 'var', 'metrics'))
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Kolejka maili (OutgoingEmail) - wysyła je `manage.py send_outbox` jednym połączeniem SMTP na partię
+OUTBOX = {
+    'BATCH_SIZE': 50,
+    'MAX_ATTEMPTS': 8,
+    'BACKOFF_BASE': 30,
+    'BACKOFF_MAX': 3600,
+    'LEASE_TIMEOUT': 300,
+}
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -0,0 +1,142 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import progress, search
+from .authentication import user_cache
+from .database import apply_sqlite_pragmas
+from .diet_plans import bulk_writes, mark_diet_days_changed
+from .exercise_index import exercise_index
+from .meal_cache import meal_catalog
+from .metrics import install_query_counter
+from .models import BodyMeasurement, CustomUser, DietDayIngredient, DietMeal, Exercise2, Ingredient, Meal, \
+    MealIngredient, TrainingSession
+
+
+@receiver(post_save, sender=Meal)
+def index_saved_meal(sender, instance, raw=False, **kwargs):
+    # Po commicie - inaczej inny proces mógłby zapisać w katalogu dane sprzed zmiany pod nową wersją
+    transaction.on_commit(meal_catalog.bump)
+    if not raw:
+        search.index_meals([instance.id])
+
+
+@receiver(post_delete, sender=Meal)
+def unindex_deleted_meal(sender, instance, **kwargs):
+    transaction.on_commit(meal_catalog.bump)
+    search.remove_meal(instance.id)
+
+
+@receiver(pre_delete, sender=Meal)
+def remember_days_of_deleted_meal(sender, instance, **kwargs):
+    # Kaskada usunie posiłek z dni diety - po usunięciu te dni trzeba przeliczyć
+    instance._diet_day_ids = set(DietMeal.objects.filter(meal=instance).values_list('diet_day_id', flat=True))
+
+
+@receiver(post_delete, sender=Meal)
+def mark_days_of_deleted_meal(sender, instance, **kwargs):
+    mark_diet_days_changed(getattr(instance, '_diet_day_ids', ()))
+
+
+@receiver(post_save, sender=MealIngredient)
+@receiver(post_delete, sender=MealIngredient)
+def index_meal_ingredients(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_meals([instance.meal_id])
+        DietDayIngredient.refresh_for_meal(instance.meal_id)
+
+
+@receiver(pre_save, sender=DietMeal)
+def remember_diet_meal_day(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk and not bulk_writes.get():
+        instance._previous_day_id = sender.objects.filter(pk=instance.pk).values_list('diet_day_id', flat=True).first()
+
+
+@receiver(post_save, sender=DietMeal)
+def mark_saved_meal_days(sender, instance, raw=False, **kwargs):
+    if not raw and not bulk_writes.get():
+        mark_diet_days_changed({instance.diet_day_id, getattr(instance, '_previous_day_id', None)} - {None})
+
+
+@receiver(post_delete, sender=DietMeal)
+def mark_deleted_meal_day(sender, instance, origin=None, **kwargs):
+    # Kaskada z dnia, diety albo użytkownika usuwa też sam dzień, a kaskadę z Meal
+    # obsługuje mark_days_of_deleted_meal - tu tylko usunięcia samych posiłków dnia
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if origin_model is DietMeal and not bulk_writes.get():
+        mark_diet_days_changed([instance.diet_day_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def index_ingredient_meals(sender, instance, raw=False, created=False, **kwargs):
+    if not raw and not created:
+        search.index_meals(MealIngredient.objects.filter(ingredient=instance).values_list('meal_id', flat=True))
+
+
+@receiver(post_save, sender=Exercise2)
+@receiver(post_delete, sender=Exercise2)
+def invalidate_exercise_index(sender, **kwargs):
+    transaction.on_commit(exercise_index.invalidate)
+
+
+@receiver(pre_save, sender=TrainingSession)
+def remember_training_date(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk:
+        instance._previous_date = sender.objects.filter(pk=instance.pk).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=TrainingSession)
+def count_saved_training(sender, instance, raw=False, created=False, **kwargs):
+    if raw:
+        return
+    if created:
+        progress.record_training(instance.user_id, instance.date, 1)
+    elif getattr(instance, '_previous_date', None) != instance.date:
+        progress.rebuild_progress(instance.user_id)
+
+
+@receiver(post_delete, sender=TrainingSession)
+def count_deleted_training(sender, instance, **kwargs):
+    progress.record_training(instance.user_id, instance.date, -1)
+
+
+@receiver(post_save, sender=BodyMeasurement)
+@receiver(post_delete, sender=BodyMeasurement)
+def refresh_progress_measurements(sender, instance, raw=False, **kwargs):
+    if not raw:
+        progress.refresh_measurements(instance.user_id)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def evict_cached_user(sender, instance, **kwargs):
+    user_cache.evict(instance.pk)
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+def evict_users_with_changed_groups(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        user_cache.evict(instance.pk)
+    elif pk_set:
+        for user_id in pk_set:
+            user_cache.evict(user_id)
+    else:
+        # group.user_set.clear() - nie wiadomo, których użytkowników dotyczyło
+        user_cache.clear()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def clear_cached_users(sender, **kwargs):
+    user_cache.clear()
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    apply_sqlite_pragmas(connection)
+    install_query_counter(connection)
@@ -0,0 +1,121 @@
+from datetime import timedelta
+from unittest import addModuleCleanup, skipUnless
+
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .benchmarks import isolated_metrics, reset_process_caches
+from .datasets import SCALES, generate_dataset
+from .diet_plans import apply_diet_days
+from .models import DietDay, DietDayIngredient, DietMeal, Meal
+from .query_plans import check_plans
+
+
+def setUpModule():
+    metrics = isolated_metrics()
+    metrics.__enter__()
+    addModuleCleanup(metrics.__exit__, None, None, None)
+
+
+class DietPlansQueryCountTest(TestCase):
+    """Kalendarz diety czyta stałą liczbę zapytań, niezależnie od długości zakresu."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = generate_dataset(users=1, months=3, meals=60, trainings=1, measurements=1)
+        cls.first_day = DietDay.objects.filter(user_diet__user=cls.user).order_by('date').first().date
+
+    def setUp(self):
+        reset_process_caches()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_constant_query_count(self):
+        # zamówienie, dieta użytkownika, dni, posiłki dni (prefetch), katalog posiłków
+        for days in (1, 30, 90):
+            with self.subTest(days=days):
+                reset_process_caches()
+                end_date = self.first_day + timedelta(days=days - 1)
+                with self.assertNumQueries(5):
+                    response = self.client.get('/works/fitter/api/diet-plans/',
+                                               {'startDate': self.first_day, 'endDate': end_date})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()['days']), days)
+
+
+class ApplyDietDaysTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = generate_dataset(users=1, months=1, meals=20, trainings=1, measurements=1)
+
+    def test_move_marks_source_day(self):
+        user_diet = self.user.userdiet_set.get()
+        source, target = DietDay.objects.filter(user_diet=user_diet).order_by('date')[:6:5]
+        moved = source.dietmeal_set.order_by('id').first()
+        rollup = DietDayIngredient.objects.filter(user_diet=user_diet)
+        total = rollup.aggregate(total=Sum('quantity'))['total']
+        version = user_diet.plan_version
+
+        # Wysłany jest tylko dzień docelowy - z posiłkiem przeniesionym z dnia źródłowego
+        meals = [{'uuid': str(dm.uuid), 'id': dm.meal_id, 'meal_type': dm.meal_type, 'grams': dm.quantity}
+                 for dm in list(target.dietmeal_set.all()) + [moved]]
+        apply_diet_days(user_diet, [{'date': target.date.isoformat(), 'meals': meals}])
+
+        source.refresh_from_db()
+        self.assertGreater(source.version, version)
+        self.assertEqual(rollup.aggregate(total=Sum('quantity'))['total'], total)
+
+    def test_unchanged_save_keeps_version(self):
+        user_diet = self.user.userdiet_set.get()
+        diet_day = DietDay.objects.filter(user_diet=user_diet).order_by('date').first()
+        version = user_diet.plan_version
+
+        meals = [{'uuid': str(dm.uuid), 'id': dm.meal_id, 'meal_type': dm.meal_type, 'grams': dm.quantity,
+                  'unit': dm.unit} for dm in diet_day.dietmeal_set.all()]
+        apply_diet_days(user_diet, [{'date': diet_day.date.isoformat(), 'meals': meals}])
+
+        user_diet.refresh_from_db()
+        self.assertEqual(user_diet.plan_version, version)
+        self.assertEqual(DietDay.objects.get(id=diet_day.id).version, diet_day.version)
+
+    def test_empty_date_creates_no_day(self):
+        user_diet = self.user.userdiet_set.get()
+        last_day = DietDay.objects.filter(user_diet=user_diet).order_by('date').last()
+        date = (last_day.date + timedelta(days=1)).isoformat()
+
+        counts = apply_diet_days(user_diet, [{'date': date, 'meals': []}])
+
+        self.assertEqual(counts['days_created'], 0)
+        self.assertFalse(DietDay.objects.filter(user_diet=user_diet, date=date).exists())
+
+
+class IngredientRollupTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        generate_dataset(users=2, months=1, meals=20, trainings=1, measurements=1)
+
+    def assertRollupCurrent(self):
+        def rollup():
+            return sorted(DietDayIngredient.objects.values_list('diet_day_id', 'ingredient_id', 'quantity'))
+        stored = rollup()
+        DietDayIngredient.refresh_for_days(DietDay.objects.values_list('id', flat=True))
+        self.assertEqual(stored, rollup())
+
+    def test_meal_delete_cascade(self):
+        Meal.objects.filter(id=DietMeal.objects.order_by('id').first().meal_id).delete()
+        self.assertRollupCurrent()
+
+    def test_queryset_delete(self):
+        DietMeal.objects.filter(id__in=DietMeal.objects.order_by('id').values('id')[:5]).delete()
+        self.assertRollupCurrent()
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN w formacie SQLite")
+class QueryPlanTest(TestCase):
+    """Żadne zapytanie endpointów (przypadki z benchmarks.CASES) nie czyta całej tabeli zamiast indeksu."""
+
+    def test_no_full_table_scans(self):
+        problems = check_plans(SCALES['small'])
+        self.assertEqual([f"{label}: {detail}" for label, table, detail, sql in problems], [])
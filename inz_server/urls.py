@@ -14,6 +14,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
@@ -23,13 +24,31 @@ from .views import RegisterView, create_order, OrderListView
 from .views import diet_plans_view, verify_token, UserWithOrdersListView, diet_plans_view2, \
     save_diet_day, DietPreferencesView, TrainingSessionView, UserProgressView, BodyMeasurementList, \
     BodyMeasurementDetail, TrainingsList, TrainingStart, MealAI, DietIngredientsView, search_exercises, get_user_roles, \
-    CustomTokenObtainPairView, verify_email, resend_verification_email, change_password
+    BodyMeasurementSeries, ExerciseProgressView, CustomTokenObtainPairView, verify_email, resend_verification_email, \
+    change_password
+
+if settings.ASYNC_VIEWS:
+    from . import async_views
+
+    diet_plans_view = async_views.diet_plans_view
+    export_diet_plan = async_views.export_diet_plan
+    get_meal = async_views.get_meal
+    search_meals = async_views.search_meals
+    user_progress_view = async_views.user_progress
+    body_measurement_list_view = async_views.body_measurements
+else:
+    export_diet_plan = views.export_diet_plan
+    get_meal = views.get_meal
+    search_meals = views.search_meals
+    user_progress_view = UserProgressView.as_view()
+    body_measurement_list_view = BodyMeasurementList.as_view()
 
 router = DefaultRouter()
 router.register(r'profile', views.UserViewSet)
 
 urlpatterns = [
     path('works/fitter/api/admin/', admin.site.urls),
+    path('works/fitter/api/metrics/', views.metrics_view, name='metrics'),
     path('works/fitter/api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('works/fitter/api/register/', RegisterView.as_view(), name='register'),
     path('', include(router.urls)),
@@ -37,31 +56,34 @@ urlpatterns = [
     path('works/fitter/api/zamowienia/', create_order, name='create_order'),
     path('works/fitter/api/user_orders/', views.user_orders, name='user_orders'),
     path('works/fitter/api/diet-plans/', diet_plans_view, name='diet_plans'),
-    path('works/fitter/api/dieteditor/', diet_plans_view2, name='diet_plans'),
+    path('works/fitter/api/diet-plans/export/<str:export_format>/', export_diet_plan, name='diet-plans-export'),
+    path('works/fitter/api/dieteditor/', diet_plans_view2, name='diet_editor'),
     path('works/fitter/api/verify-token/', verify_token, name='verify_token'),
-    path('works/fitter/api/meal/<int:meal_id>/', views.get_meal, name='get_meal'),
-    path('works/fitter/api/search_meals/', views.search_meals, name='search_meals'),
+    path('works/fitter/api/meal/<int:meal_id>/', get_meal, name='get_meal'),
+    path('works/fitter/api/search_meals/', search_meals, name='search_meals'),
     path('works/fitter/api/users/', OrderListView.as_view(), name='users-with-orders'),
     path('works/fitter/api/save_diet_data/', save_diet_day, name='save_diet_day'),
     path('works/fitter/api/diet-preferences/', DietPreferencesView.as_view(), name='diet-preferences'),
     path('works/fitter/api/training-session/', TrainingSessionView.as_view(), name='training-session'),
-    path('works/fitter/api/user-progress/', UserProgressView.as_view(), name='user-progress'),
-    path('works/fitter/api/measurements/', BodyMeasurementList.as_view(), name='body-measurements'),
-    path('works/fitter/api/trainings/', TrainingsList.as_view(), name='body-measurements'),
-    path('works/fitter/api/training-start/', TrainingStart.as_view(), name='body-measurements'),
+    path('works/fitter/api/user-progress/', user_progress_view, name='user-progress'),
+    path('works/fitter/api/measurements/', body_measurement_list_view, name='body-measurements'),
+    path('works/fitter/api/trainings/', TrainingsList.as_view(), name='trainings'),
+    path('works/fitter/api/training-start/', TrainingStart.as_view(), name='training-start'),
     path('works/fitter/api/mealAI/', MealAI, name='mealAI'),
     path('works/fitter/api/mealAIResponse/', views.MealAIResponse, name='callback-view'),
 
     path('works/fitter/api/verify/<uuid:token>/', verify_email, name='verify-email'),
     path('works/fitter/api/resend-verification-email/', resend_verification_email, name='resend-verification-email'),
 
+    path('works/fitter/api/exercise-progress/', ExerciseProgressView.as_view(), name='exercise-progress'),
+    path('works/fitter/api/measurements/series/', BodyMeasurementSeries.as_view(), name='body-measurement-series'),
     path('works/fitter/api/measurements/<int:pk>/', BodyMeasurementDetail.as_view(), name='body-measurement-detail'),
     path('works/fitter/api/diet-ingredients/<str:start_date>/<str:end_date>/', DietIngredientsView.as_view(),
          name='diet-ingredients'),
     path('works/fitter/api/training-session/<int:training_id>/add-exercise', views.add_exercise_to_training_session,
          name='add_exercise_to_training_session'),
     path('works/fitter/api/exercises', search_exercises, name='search_exercises'),
-    path('works/fitter/api/user-data/', get_user_roles, name='search_exercises'),
-    path('works/fitter/api/change-password/', change_password, name='search_exercises'),
+    path('works/fitter/api/user-data/', get_user_roles, name='user-data'),
+    path('works/fitter/api/change-password/', change_password, name='change-password'),
 
 ]
@@ -1,16 +1,21 @@
+import csv
+import hmac
 import json
+import logging
 from collections import defaultdict
+from itertools import islice
 from datetime import datetime, timedelta
 
-import requests
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
-from django.core.mail import send_mail
-from django.db.models import Count
-from django.db.models import Q
-from django.db.models import Sum, F
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, Max, Min
+from django.db.models import Prefetch
+from django.db.models import Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+from django.http import HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.utils import timezone
@@ -22,7 +27,7 @@ from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.decorators import permission_classes
 from rest_framework.generics import RetrieveUpdateDestroyAPIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -30,20 +35,32 @@ from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 
-from inz_server.models import Dieta, Zamowienie, CustomUser, DietMeal, MealIngredient, Exercise2, MeasurementUnit, \
-    EmailVerificationToken
+from inz_server.models import Dieta, Zamowienie, CustomUser, DietMeal, EmailVerificationToken, DietDayIngredient
 from .models import BodyMeasurement
 from .models import DietDay
-from .models import Meal
 from .models import TrainingSession
 from .models import UserDiet
+from .analytics import exercise_progression
+from .authentication import user_roles
+from .mealai import enqueue_generation
+from .search import search_meal_ids
+from .exercise_index import exercise_index
+from .meal_cache import meal_catalog
+from .progress import get_progress, week_key
+from .renderers import ORJSONResponse, django_default, dumps
+from .outbox import queue_email
+from .metrics import registry as metrics_registry, render_prometheus
+from .diet_plans import AI_DIET_ID, apply_diet_days, create_plan_days, day_meals, with_virtual_days, \
+    ingest_generated_plan, iter_plan_days, EXPORT_CHUNK_DAYS
 from .serializers import BodyMeasurementSerializer, OrderSerializer
 from .serializers import CustomTokenObtainPairSerializer
 from .serializers import ExerciseSerializer
 from .serializers import TrainingSessionSerializer
-from .serializers import UserDietSerializer, DietIngredientsSerializer, ExerciseSerializer2
+from .serializers import UserDietSerializer, DietIngredientsSerializer
 from .serializers import UserSerializer, ZamowienieSerializer, UserSerializer2
 
+logger = logging.getLogger(__name__)
+
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
@@ -90,6 +107,17 @@ class CustomPagination(PageNumberPagination):
     page_size = 10
 
 
+class TrainingSessionCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-date', '-id')
+
+
+EXERCISE_PAGE_SIZE = 20
+EXERCISE_MAX_PAGE_SIZE = 100
+
+
 class OrderListView(generics.ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
@@ -155,10 +183,7 @@ def create_order(request):
     zamowienie.user_diet = user_diet
     zamowienie.save()
 
-    if dieta_id != 1:
-        for month in range(duration_months):
-            for day in range(30):
-                DietDay.objects.create(user_diet=user_diet, date=(data_rozpoczecia + timedelta(days=day + month * 30)))
+    create_plan_days(user_diet, duration_months)
 
     data = {
         "message": "Zamówienie zostało pomyślnie utworzone.",
@@ -177,6 +202,59 @@ def user_orders(request):
     return Response(serializer.data)
 
 
+def diet_meal_data(diet_meal, meal):
+    return {
+        'id': meal.id,
+        'name': meal.name,
+        'quantity': diet_meal.quantity,
+        'unit': diet_meal.unit,
+        'uuid': diet_meal.uuid,
+        'short_description': meal.short_description,
+        'calories': meal.calories,
+        'calories_per_100g': meal.calories_per_100g,
+        "default_grams": meal.default_grams,
+        'carbohydrates': meal.carbohydrates,
+        'fats': meal.fats,
+        'protein': meal.protein,
+        'preparation_time': meal.preparation_time,
+        'image_url': meal.image_url,
+    }
+
+
+def diet_day_data(diet_day, meals):
+    meals_by_type = defaultdict(list)
+    for dm in day_meals(diet_day):
+        meals_by_type[dm.meal_type].append(diet_meal_data(dm, meals[dm.meal_id]))
+
+    return {
+        'date': diet_day.date,
+        'meals': {
+            'breakfast': meals_by_type['breakfast'],
+            'lunch': meals_by_type['lunch'],
+            'dinner': meals_by_type['dinner'],
+            'afternoon_snack': meals_by_type['afternoon_snack'],
+            'evening_snack': meals_by_type['evening_snack'],
+        }
+    }
+
+
+def diet_plan_data(order, user_diet, diet_days, meals):
+    """Odpowiedź diet_plans_view (wspólna dla widoku sync i async_views)."""
+    order_data = {
+        'id': order.id,
+        'start_date': order.data_rozpoczecia,
+        'end_date': order.data_zakonczenia,
+        'status': order.status,
+        'dieta': order.dieta.id,
+    }
+
+    return {
+        'preferences_set': user_diet.preferences_set,
+        'order_info': order_data,
+        'days': [diet_day_data(dd, meals) for dd in diet_days]
+    }
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def diet_plans_view(request):
@@ -188,71 +266,98 @@ def diet_plans_view(request):
         start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
         end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
 
-        order = Zamowienie.objects.filter(uzytkownik_id=user_id).latest('data_rozpoczecia')
+        order = Zamowienie.objects.select_related('dieta').filter(uzytkownik_id=user_id).latest('data_rozpoczecia')
         user_diet = UserDiet.objects.filter(user_id=user_id).latest('data_rozpoczecia')
 
-        order_data = {
-            'id': order.id,
-            'start_date': order.data_rozpoczecia,
-            'end_date': order.data_zakonczenia,
-            'status': order.status,
-            'dieta': order.dieta.id,
-        }
-
+        # Wszystkie posiłki z zakresu ładowane jednym zapytaniem, niezależnie od liczby dni
         diet_days = DietDay.objects.filter(
             user_diet=user_diet,
             date__range=[start_date_obj, end_date_obj]
-        ).prefetch_related('meals')
+        ).prefetch_related(
+            Prefetch('dietmeal_set', queryset=DietMeal.objects.order_by('id'))
+        )
+        diet_days = with_virtual_days(user_diet, start_date_obj, end_date_obj, diet_days)
+        meals = meal_catalog.get_many({dm.meal_id for dd in diet_days for dm in day_meals(dd)})
+        data = diet_plan_data(order, user_diet, diet_days, meals)
 
-        def meal_data(diet_meal):
-            meal = diet_meal.meal
-            return {
-                'id': meal.id,
-                'name': meal.name,
-                'quantity': diet_meal.quantity,
-                'unit': diet_meal.unit,
-                'uuid': diet_meal.uuid,
-                'short_description': meal.short_description,
-                'calories': meal.calories,
-                'calories_per_100g': meal.calories_per_100g,
-                "default_grams": meal.default_grams,
-                'carbohydrates': meal.carbohydrates,
-                'fats': meal.fats,
-                'protein': meal.protein,
-                'preparation_time': meal.preparation_time,
-                'image_url': meal.image_url,
-            }
+        return ORJSONResponse(data, safe=False)
 
-        data = {
-            'preferences_set': user_diet.preferences_set,
-            'order_info': order_data,
-            'days': []
-        }
+    except Exception as e:
+        return ORJSONResponse({'error': str(e)}, status=400)
 
-        for dd in diet_days:
-            meals_by_type = defaultdict(list)
-            diet_meals = DietMeal.objects.filter(diet_day=dd).select_related('meal')
-            for dm in diet_meals:
-                meal_type = dm.meal_type
-                meals_by_type[meal_type].append(meal_data(dm))
-
-            day_data = {
-                'date': dd.date,
-                'meals': {
-                    'breakfast': meals_by_type['breakfast'],
-                    'lunch': meals_by_type['lunch'],
-                    'dinner': meals_by_type['dinner'],
-                    'afternoon_snack': meals_by_type['afternoon_snack'],
-                    'evening_snack': meals_by_type['evening_snack'],
-                }
-            }
 
-            data['days'].append(day_data)
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+EXPORT_CSV_COLUMNS = ['date', 'meal_type', 'meal_id', 'name', 'quantity', 'unit', 'calories', 'protein', 'fats',
+                      'carbohydrates', 'uuid']
 
-        return JsonResponse(data, safe=False)
 
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+class Echo:
+    """Bufor dla csv.writer, który zwraca wiersz zamiast go zapisywać."""
+
+    def write(self, value):
+        return value
+
+
+def export_chunks(user_diet, start_date, end_date, export_format):
+    """
+    Treść eksportu planu: jedna linia NDJSON na dzień albo wiersze CSV (wiersz na posiłek, pusty dzień
+    jako sama data). Zwraca kawałek na każdą partię EXPORT_CHUNK_DAYS dni - pamięć nie zależy
+    od długości planu.
+    """
+    writer = csv.writer(Echo())
+    buffer = []
+    if export_format == 'csv':
+        buffer.append(writer.writerow(EXPORT_CSV_COLUMNS).encode())
+
+    diet_days = iter_plan_days(user_diet, start_date, end_date)
+    while chunk := list(islice(diet_days, EXPORT_CHUNK_DAYS)):
+        meals = meal_catalog.get_many({dm.meal_id for dd in chunk for dm in day_meals(dd)})
+        for diet_day in chunk:
+            if export_format == 'ndjson':
+                buffer.append(dumps(diet_day_data(diet_day, meals), default=django_default) + b'\n')
+            else:
+                rows = [
+                    [diet_day.date, dm.meal_type, dm.meal_id, meals[dm.meal_id].name, dm.quantity, dm.unit,
+                     meals[dm.meal_id].calories, meals[dm.meal_id].protein, meals[dm.meal_id].fats,
+                     meals[dm.meal_id].carbohydrates, dm.uuid]
+                    for dm in day_meals(diet_day)
+                ] or [[diet_day.date]]
+                buffer.extend(writer.writerow(row).encode() for row in rows)
+        yield b''.join(buffer)
+        buffer = []
+    # Pusty plan - sam nagłówek CSV
+    if buffer:
+        yield b''.join(buffer)
+
+
+def export_response(chunks, user_diet, export_format):
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="diet-plan-{user_diet.id}.{export_format}"'
+    return response
+
+
+def export_range(request):
+    # Opcjonalny zakres dat; bez niego eksportowany jest cały plan
+    start_date, end_date = request.GET.get('startDate'), request.GET.get('endDate')
+    return (datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None,
+            datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_diet_plan(request, export_format):
+    if export_format not in EXPORT_FORMATS:
+        return ORJSONResponse({'error': f"Nieobsługiwany format: {export_format}"}, status=400)
+    try:
+        start_date, end_date = export_range(request)
+        user_diet = UserDiet.objects.filter(user=request.user).latest('data_rozpoczecia')
+    except (ValueError, UserDiet.DoesNotExist) as e:
+        return ORJSONResponse({'error': str(e)}, status=400)
+
+    return export_response(export_chunks(user_diet, start_date, end_date, export_format), user_diet, export_format)
 
 
 @api_view(['GET'])
@@ -261,38 +366,54 @@ def diet_plans_view2(request):
     orderID = request.GET.get('orderID')
     start_date = request.GET.get('startDate')
     end_date = request.GET.get('endDate')
+    since_version = request.GET.get('sinceVersion')
 
     try:
-        zamowienie = Zamowienie.objects.get(id=orderID)
-        user_nick = zamowienie.uzytkownik
-        user = CustomUser.objects.get(username=user_nick)
+        zamowienie = Zamowienie.objects.select_related('uzytkownik', 'user_diet').get(id=orderID)
+        user = zamowienie.uzytkownik
         start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
         end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
         user_diet = zamowienie.user_diet
-        diet_plan_details = {
-            'username': user.username,
-            'diet_id': user_diet.id,
-            'diet_type': user_diet.diet_type,
-            'diet_start_date': user_diet.data_rozpoczecia,
-            'diet_end_date': user_diet.data_zakonczenia,
-            'gluten_free': user_diet.gluten_free,
-            'lactose_free': user_diet.lactose_free,
-            'nut_free': user_diet.nut_free,
-            'fish_free': user_diet.fish_free,
-            'soy_free': user_diet.soy_free,
-            'food_preferences_1': user_diet.get_preferences_by_value(2),
-            'food_preferences_2': user_diet.get_preferences_by_value(0),
-            'status': zamowienie.status,
-            'calories': calculate_caloric_needs(user_diet),
-        }
 
         diet_days = DietDay.objects.filter(
             user_diet=user_diet,
             date__range=[start_date_obj, end_date_obj]
-        ).prefetch_related('meals')
+        )
+
+        # Tryb delta: tylko dni zmienione od wersji, którą klient już ma
+        if since_version is not None:
+            since_version = int(since_version)
+            if since_version >= user_diet.plan_version:
+                diet_days = diet_days.none()
+            else:
+                diet_days = diet_days.filter(version__gt=since_version)
+        else:
+            diet_plan_details = {
+                'username': user.username,
+                'diet_id': user_diet.id,
+                'diet_type': user_diet.diet_type,
+                'diet_start_date': user_diet.data_rozpoczecia,
+                'diet_end_date': user_diet.data_zakonczenia,
+                'gluten_free': user_diet.gluten_free,
+                'lactose_free': user_diet.lactose_free,
+                'nut_free': user_diet.nut_free,
+                'fish_free': user_diet.fish_free,
+                'soy_free': user_diet.soy_free,
+                'food_preferences_1': user_diet.get_preferences_by_value(2),
+                'food_preferences_2': user_diet.get_preferences_by_value(0),
+                'status': zamowienie.status,
+                'calories': calculate_caloric_needs(user_diet),
+            }
+
+        diet_days = diet_days.prefetch_related(
+            Prefetch('dietmeal_set', queryset=DietMeal.objects.order_by('id'))
+        )
+        if since_version is None:
+            diet_days = with_virtual_days(user_diet, start_date_obj, end_date_obj, diet_days)
+        meals = meal_catalog.get_many({dm.meal_id for dd in diet_days for dm in day_meals(dd)})
 
         def meal_data(diet_meal):
-            meal = diet_meal.meal
+            meal = meals[diet_meal.meal_id]
             return {
                 'id': meal.id,
                 'name': meal.name,
@@ -313,16 +434,26 @@ def diet_plans_view2(request):
 
         days_data = [{
             'date': dd.date,
-            'meals': [meal_data(dm) for dm in DietMeal.objects.filter(diet_day=dd)]
+            'meals': [meal_data(dm) for dm in day_meals(dd)]
         } for dd in diet_days]
-        data = {
-            'diet_plan': diet_plan_details,
-            'days': days_data
-        }
 
-        return JsonResponse(data, safe=False)
+        if since_version is not None:
+            data = {
+                'version': user_diet.plan_version,
+                'since_version': since_version,
+                'status': zamowienie.status,
+                'days': days_data
+            }
+        else:
+            data = {
+                'version': user_diet.plan_version,
+                'diet_plan': diet_plan_details,
+                'days': days_data
+            }
+
+        return ORJSONResponse(data, safe=False)
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=400)
+        return ORJSONResponse({'error': str(e)}, status=400)
 
 
 @api_view(['POST'])
@@ -339,56 +470,60 @@ def verify_token(request):
     return Response({'detail': 'Token is valid'}, status=status.HTTP_200_OK)
 
 
+def meal_detail(meal):
+    return {
+        'id': meal.id,
+        'name': meal.name,
+        'long_description': meal.long_description,
+        'calories': meal.calories,
+        'calories_per_100g': meal.calories_per_100g,
+        "default_grams": meal.default_grams,
+        'carbohydrates': meal.carbohydrates,
+        'fats': meal.fats,
+        'protein': meal.protein,
+        'preparation_time': meal.preparation_time,
+        'image_url': meal.image_url,
+    }
+
+
+def meal_search_result(meal):
+    return {
+        'id': meal.id,
+        'name': meal.name,
+        'long_description': meal.long_description,
+        'calories': meal.calories,
+        'grams': 100,
+        'calories_per_100g': meal.calories_per_100g,
+        "default_grams": meal.default_grams,
+        'carbohydrates': meal.carbohydrates,
+        'fats': meal.fats,
+        'protein': meal.protein,
+        'preparation_time': meal.preparation_time,
+        'image_url': meal.image_url,
+        'lactose_free': meal.lactose,
+        'nut_free': meal.nut,
+        'soy_free': meal.soy,
+        'gluten_free': meal.gluten,
+        'fish_free': meal.fish,
+    }
+
+
 def get_meal(request, meal_id):
-    try:
-        meal = Meal.objects.get(id=meal_id)
-        meal_data = {
-            'id': meal.id,
-            'name': meal.name,
-            'long_description': meal.long_description,
-            'calories': meal.calories,
-            'calories_per_100g': meal.calories_per_100g,
-            "default_grams": meal.default_grams,
-            'carbohydrates': meal.carbohydrates,
-            'fats': meal.fats,
-            'protein': meal.protein,
-            'preparation_time': meal.preparation_time,
-            'image_url': meal.image_url,
-        }
-        return JsonResponse(meal_data)
-    except Meal.DoesNotExist:
-        return JsonResponse({"error": "Meal not found"}, status=404)
+    meal = meal_catalog.get(meal_id)
+    if meal is None:
+        return ORJSONResponse({"error": "Meal not found"}, status=404)
+    return ORJSONResponse(meal_detail(meal))
 
 
 @api_view(['GET'])
 def search_meals(request):
     query = request.GET.get('query', '')
 
-    meals = Meal.objects.filter(Q(name__icontains=query))[:10]
-
-    meal_list = []
-    for meal in meals:
-        meal_data = {
-            'id': meal.id,
-            'name': meal.name,
-            'long_description': meal.long_description,
-            'calories': meal.calories,
-            'grams': 100,
-            'calories_per_100g': meal.calories_per_100g,
-            "default_grams": meal.default_grams,
-            'carbohydrates': meal.carbohydrates,
-            'fats': meal.fats,
-            'protein': meal.protein,
-            'preparation_time': meal.preparation_time,
-            'image_url': meal.image_url,
-            'lactose_free': meal.lactose,
-            'nut_free': meal.nut,
-            'soy_free': meal.soy,
-            'gluten_free': meal.gluten,
-            'fish_free': meal.fish,
-        }
-        meal_list.append(meal_data)
-    return JsonResponse(meal_list, safe=False)
+    meal_ids = search_meal_ids(query, limit=10)
+    meals = meal_catalog.get_many(meal_ids)
+
+    meal_list = [meal_search_result(meals[meal_id]) for meal_id in meal_ids if meal_id in meals]
+    return ORJSONResponse(meal_list, safe=False)
 
 
 @api_view(['POST'])
@@ -399,62 +534,15 @@ def save_diet_day(request):
     zamowienie_status = request.data.get('status')
 
     try:
-        zamowienie = Zamowienie.objects.get(id=orderID)
-        user_nick = zamowienie.uzytkownik
-        user = CustomUser.objects.get(username=user_nick)
-
-        user_diet = zamowienie.user_diet
-        zamowienie.status = zamowienie_status
-        zamowienie.save()
+        zamowienie = Zamowienie.objects.select_related('user_diet').get(id=orderID)
         diet_data = request.data.get('diet_data')
 
-        for day_data in diet_data:
-            date_str = day_data.get('date')
-            meals_data = day_data.get('meals')
-
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-
-            diet_day, created = DietDay.objects.get_or_create(
-                user_diet=user_diet,
-                date=date_obj,
-            )
+        with transaction.atomic():
+            zamowienie.status = zamowienie_status
+            zamowienie.save()
+            counts = apply_diet_days(zamowienie.user_diet, diet_data)
 
-            sent_meals_uuids = {meal_data.get('uuid') for meal_data in meals_data if meal_data.get('uuid')}
-
-            for meal_data in meals_data:
-                meal_uuid = meal_data.get('uuid')
-                meal_type = meal_data.get('meal_type')
-                meal_id = meal_data.get('id')
-                quantity = meal_data.get('grams') or 0
-                unit = meal_data.get('unit', 'GRAMS')
-
-                meal, _ = Meal.objects.get_or_create(id=meal_id)
-
-                if meal_uuid:
-                    diet_meal, created = DietMeal.objects.update_or_create(
-                        uuid=meal_uuid,
-                        defaults={
-                            'diet_day': diet_day,
-                            'meal_type': meal_type,
-                            'meal': meal,
-                            'quantity': quantity,
-                            'unit': unit
-                        }
-                    )
-                else:
-                    diet_meal = DietMeal.objects.create(
-                        diet_day=diet_day,
-                        meal_type=meal_type,
-                        meal=meal,
-                        quantity=quantity,
-                        unit=unit
-                    )
-
-            DietMeal.objects.filter(diet_day=diet_day).exclude(uuid__in=sent_meals_uuids).delete()
-
-            diet_day.save()
-
-        return Response({"message": "Diet days saved successfully."}, status=status.HTTP_201_CREATED)
+        return Response({"message": "Diet days saved successfully.", **counts}, status=status.HTTP_201_CREATED)
 
     except Exception as e:
         print(f"Wystąpił błąd: {e}")
@@ -516,15 +604,21 @@ class DietPreferencesView(APIView):
             serializer = UserDietSerializer(user_diet, data=updated_data, partial=True)
             if serializer.is_valid():
                 serializer.save()
+                data = dict(serializer.data)
                 try:
                     zamowienie = Zamowienie.objects.get(id=orderID)
-                    zamowienie.status = 'Pending'
-                    zamowienie.save()
-                    if dieta.id == 1:
-                        MealAI(user_diet, zamowienie.duration)
+                    with transaction.atomic():
+                        # Plan AI generuje worker kolejki - odpowiedź nie czeka na generator
+                        if dieta.id == AI_DIET_ID:
+                            zamowienie.status = 'aipending'
+                            MealAI(user_diet, zamowienie.duration)
+                        else:
+                            zamowienie.status = 'Pending'
+                        zamowienie.save()
+                    data['status'] = zamowienie.status
                 except Zamowienie.DoesNotExist:
                     pass
-                return Response(serializer.data, status=status.HTTP_200_OK)
+                return Response(data, status=status.HTTP_200_OK)
             else:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -544,33 +638,27 @@ class TrainingSessionView(APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserProgressView(APIView):
-    def get(self, request, *args, **kwargs):
-        user = request.user
-        today = datetime.now()
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
+def progress_data(progress, last_three_trainings):
+    return {
+        'num_trainings_this_week': progress.weekly_trainings.get(week_key(timezone.now()), 0),
+        'last_three_trainings': TrainingSessionSerializer(last_three_trainings, many=True).data,
+        'total_trainings': progress.total_trainings,
+        'body_measurements': progress.latest_measurements
+    }
 
-        # Treningi z tego tygodnia
-        trainings_this_week = TrainingSession.objects.filter(user=user, date__range=[week_start, week_end])
-        num_trainings_this_week = trainings_this_week.count()
 
-        # Ostatnie 3 treningi
-        last_three_trainings = TrainingSession.objects.filter(user=user).order_by('-date')[:3]
+def last_trainings(user, count=3):
+    return TrainingSessionSerializer.setup_eager_loading(
+        TrainingSession.objects.filter(user=user).order_by('-date')[:count]
+    )
 
-        # Statystyki ogólne
-        total_trainings = TrainingSession.objects.filter(user=user).count()
 
-        # Serializacja danych
-        training_sessions_serializer = TrainingSessionSerializer(last_three_trainings, many=True)
-        body_measurements_serializer = BodyMeasurementSerializer(BodyMeasurement.objects.filter(user=user), many=True)
+class UserProgressView(APIView):
+    permission_classes = [IsAuthenticated]
 
-        return Response({
-            'num_trainings_this_week': num_trainings_this_week,
-            'last_three_trainings': training_sessions_serializer.data,
-            'total_trainings': total_trainings,
-            'body_measurements': body_measurements_serializer.data
-        })
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        return Response(progress_data(get_progress(user), last_trainings(user)))
 
 
 class BodyMeasurementList(APIView):
@@ -595,12 +683,90 @@ class BodyMeasurementList(APIView):
 
         serializer = BodyMeasurementSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save()
+            try:
+                with transaction.atomic():
+                    serializer.save()
+            except IntegrityError:
+                # Równoległy zapis pomiaru z tą samą datą (unique_body_measurement_date)
+                return Response(
+                    {'error': 'A measurement for this date already exists.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+MEASUREMENT_FIELDS = ['waist', 'chest', 'bicep', 'thigh']
+MEASUREMENT_BUCKETS = {'day': (TruncDay, 1), 'week': (TruncWeek, 7), 'month': (TruncMonth, 30)}
+MEASUREMENT_MAX_POINTS = 400
+
+
+def chart_range(params):
+    # Zakres wykresów: domyślnie ostatni rok do dziś
+    end_date = datetime.strptime(params['endDate'], '%Y-%m-%d').date() if 'endDate' in params else timezone.localdate()
+    start_date = datetime.strptime(params['startDate'], '%Y-%m-%d').date() \
+        if 'startDate' in params else end_date - timedelta(days=365)
+    return start_date, end_date
+
+
+class BodyMeasurementSeries(APIView):
+    """Pomiary ciała zagregowane w bazie do przedziałów (dzień/tydzień/miesiąc) - dane do wykresów."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        bucket = request.query_params.get('bucket', 'week')
+        if bucket not in MEASUREMENT_BUCKETS:
+            return Response({'error': f"bucket musi być jednym z: {', '.join(MEASUREMENT_BUCKETS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            start_date, end_date = chart_range(request.query_params)
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        trunc, bucket_days = MEASUREMENT_BUCKETS[bucket]
+        if start_date > end_date or (end_date - start_date).days // bucket_days > MEASUREMENT_MAX_POINTS:
+            return Response({'error': 'Nieprawidłowy zakres dat lub zbyt wiele punktów - wybierz większy bucket.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        aggregates = {'count': Count('id')}
+        for field in MEASUREMENT_FIELDS:
+            aggregates.update({f'{field}_avg': Avg(field), f'{field}_min': Min(field), f'{field}_max': Max(field)})
+        rows = BodyMeasurement.objects.filter(user=request.user, date__range=(start_date, end_date)) \
+            .annotate(bucket=trunc('date')).values('bucket').annotate(**aggregates).order_by('bucket')
+
+        def stats(row, field):
+            if row[f'{field}_avg'] is None:
+                return None
+            return {key: round(float(row[f'{field}_{key}']), 2) for key in ('avg', 'min', 'max')}
+
+        return Response({
+            'bucket': bucket,
+            'start_date': start_date,
+            'end_date': end_date,
+            'series': [
+                {'date': row['bucket'], 'count': row['count'], **{field: stats(row, field) for field in MEASUREMENT_FIELDS}}
+                for row in rows
+            ],
+        })
+
+
+class ExerciseProgressView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        try:
+            start_date, end_date = chart_range(request.query_params)
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            'exercises': exercise_progression(request.user, start_date, end_date),
+        })
+
+
 class BodyMeasurementDetail(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     queryset = BodyMeasurement.objects.all()
@@ -614,9 +780,18 @@ class TrainingsList(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, format=None):
-        training_sessions = TrainingSession.objects.filter(user=request.user).order_by('date')
-        serializer = TrainingSessionSerializer(training_sessions, many=True)
-        return Response(serializer.data)
+        training_sessions = TrainingSessionSerializer.setup_eager_loading(
+            TrainingSession.objects.filter(user=request.user)
+        )
+        # Bez parametrów stronicowania zwracamy całą historię, jak dotąd
+        if 'cursor' not in request.query_params and 'page_size' not in request.query_params:
+            serializer = TrainingSessionSerializer(training_sessions.order_by('date'), many=True)
+            return Response(serializer.data)
+
+        paginator = TrainingSessionCursorPagination()
+        page = paginator.paginate_queryset(training_sessions, request, view=self)
+        serializer = TrainingSessionSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request, format=None):
         existing_measurement = BodyMeasurement.objects.filter(
@@ -632,7 +807,15 @@ class TrainingsList(APIView):
 
         serializer = BodyMeasurementSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            serializer.save()
+            try:
+                with transaction.atomic():
+                    serializer.save()
+            except IntegrityError:
+                # Równoległy zapis pomiaru z tą samą datą (unique_body_measurement_date)
+                return Response(
+                    {'error': 'A measurement for this date already exists.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -676,43 +859,23 @@ def MealAIResponse(request):
     if not user_id or not diet_plan:
         return Response({"error": "Niekompletne dane."}, status=400)
 
-    process_diet_plan(user_id, user_diet, diet_plan)
+    report = process_diet_plan(user_id, user_diet, diet_plan)
 
-    return Response({"message": "Dane otrzymane i przetworzone"})
+    return Response({"message": "Dane otrzymane i przetworzone", **report})
 
 
 def process_diet_plan(user_id, user_diet, diet_plan):
-    print("[PROCESSING]")
-
     new_diet = UserDiet.objects.get(id=user_diet)
 
-    for day in diet_plan:
-        date = day['date']
-        total_calories = day['total_calories']
-        diet_day = DietDay.objects.create(user_diet=new_diet, date=date)
-
-        for meal_data in day['meals']:
-            meal_name = meal_data['name']
-            meal_query = Meal.objects.filter(name=meal_name)
-
-            if meal_query.exists():
-                meal = meal_query.first()
-
-                quantity = meal_data['portions'] * 100
-                meal_type = meal_data['meal_type']
+    with transaction.atomic():
+        report = ingest_generated_plan(new_diet, diet_plan)
+        zamowienie = Zamowienie.objects.get(user_diet=new_diet)
+        zamowienie.status = "Completed"
+        zamowienie.save()
 
-                DietMeal.objects.create(
-                    meal=meal,
-                    diet_day=diet_day,
-                    meal_type=meal_type,
-                    quantity=quantity,
-                    unit=MeasurementUnit.GRAMS
-                )
-            else:
-                print(f"No meal found with name: {meal_name}")
-    zamowienie = Zamowienie.objects.get(user_diet=new_diet)
-    zamowienie.status = "Completed"
-    zamowienie.save()
+    if report['unmatched_meals']:
+        logger.warning("No meal found with name: %s", ', '.join(report['unmatched_meals']))
+    return report
 
 
 def calculate_caloric_needs(user_diet):
@@ -738,10 +901,7 @@ def calculate_caloric_needs(user_diet):
 
     return round(calories)
 def MealAI(user_diet, duration):
-    fastapi_url = 'http://localhost:9000/generate-diet/'
-    #fastapi_url = ' http://192.168.1.106:9000/generate-diet/'
-
-    user_id= user_diet.user_id
+    user_id = user_diet.user_id
 
     # Tworzenie listy alergenów do unikania
     allergens_to_avoid = []
@@ -796,25 +956,9 @@ def MealAI(user_diet, duration):
         "allergens_to_avoid": allergens_to_avoid,
         "max_calories": calculate_caloric_needs(user_diet),
         "user_weight": user_diet.weight,
-        "callback_url": "http://localhost:8000/works/fitter/api/mealAIResponse/"
-
-
     }
 
-    #"callback_url": "http://192.168.1.106:8000/api/mealAIResponse/"
-    #"callback_url": "http://localhost:8000/api/mealAIResponse/"
-    # Przesyłanie danych z żądania Django do FastAPI
-    try:
-        response = requests.post(fastapi_url, json=data_to_send)
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        return Response({'error': str(e)}, status=500)
-
-    # Przetwarzanie odpowiedzi z serwera FastAPI
-    if response.status_code == 200:
-        return Response(response.json())
-    else:
-        return Response({'error': 'Błąd serwera FastAPI'}, status=response.status_code)
+    return enqueue_generation(user_diet, data_to_send)
 
 
 class DietIngredientsView(APIView):
@@ -825,14 +969,14 @@ class DietIngredientsView(APIView):
 
         user_diets = UserDiet.objects.filter(user=user, data_rozpoczecia__lte=end_date,
                                              data_zakonczenia__gte=start_date)
-        diet_days = DietDay.objects.filter(user_diet__in=user_diets, date__range=[start_date, end_date])
-        diet_meals = DietMeal.objects.filter(diet_day__in=diet_days)
-
-        ingredients = MealIngredient.objects.filter(meal__dietmeal__in=diet_meals).values(
+        # Sumy dzienne utrzymywane przy zapisie posiłków (DietDayIngredient)
+        ingredients = DietDayIngredient.objects.filter(
+            user_diet__in=user_diets, date__range=[start_date, end_date]
+        ).values(
             'ingredient__name', 'ingredient__measurement_unit'
         ).annotate(
-            total_quantity=Sum(F('quantity') * F('meal__dietmeal__quantity') / 100)
-        )
+            total_quantity=Sum('quantity')
+        ).order_by('ingredient__name', 'ingredient__measurement_unit')
 
         serializer = DietIngredientsSerializer({'ingredients': ingredients})
         return Response(serializer.data)
@@ -841,17 +985,34 @@ class DietIngredientsView(APIView):
 @api_view(['GET'])
 def search_exercises(request):
     query = request.GET.get('search', '')
-    exercises = Exercise2.objects.filter(name__icontains=query)
-    serializer = ExerciseSerializer2(exercises, many=True)
-    return Response(serializer.data)
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        limit = min(max(int(request.GET.get('limit', EXERCISE_PAGE_SIZE)), 1), EXERCISE_MAX_PAGE_SIZE)
+    except ValueError:
+        return Response({'error': 'Nieprawidłowe parametry stronicowania.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    total, exercises = exercise_index.search(query, offset=(page - 1) * limit, limit=limit)
+    response = Response([{'name': name, 'description': description} for name, description in exercises])
+    response['X-Total-Count'] = total
+    return response
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_user_roles(request):
+    token = request.auth
+    # Tokeny wydane przy logowaniu niosą role i dane konta - odpowiadamy bez zapytań do bazy
+    if token is not None and 'roles' in token:
+        user_data = {
+            'username': token['username'],
+            'roles': token['roles'],
+            'email': token['email'],
+        }
+        return Response(user_data, status=status.HTTP_200_OK)
+
     user = request.user
     if user.is_authenticated:
-        roles = [group.name for group in user.groups.all()]
+        roles = user_roles(user)
         user_data = {
             'username': user.username,
             'roles': roles,
@@ -868,34 +1029,34 @@ def verify_email(request, token):
 
         # Sprawdź, czy token był już użyty do weryfikacji
         if token.verified:
-            return JsonResponse({"message": "E-mail został już zweryfikowany."}, status=200)
+            return ORJSONResponse({"message": "E-mail został już zweryfikowany."}, status=200)
 
         # Sprawdź, czy token nie wygasł
         if token.is_expired:
-            return JsonResponse({"message": "Link weryfikacyjny wygasł."}, status=400)
+            return ORJSONResponse({"message": "Link weryfikacyjny wygasł."}, status=400)
 
         # Ustaw flagę zweryfikowanego e-maila i zapisz token
         token.user.email_verified = True
         token.user.save()
         token.verified = True
         token.save()
-        return JsonResponse({"message": "E-mail zweryfikowany."}, status=200)
+        return ORJSONResponse({"message": "E-mail zweryfikowany."}, status=200)
 
     except EmailVerificationToken.DoesNotExist:
-        return JsonResponse({"message": "Nieprawidłowy token."}, status=404)
+        return ORJSONResponse({"message": "Nieprawidłowy token."}, status=404)
 
 
 @csrf_exempt
 def resend_verification_email(request):
     if request.method != 'POST':
-        return JsonResponse({"message": "Nieprawidłowa metoda żądania."}, status=405)
+        return ORJSONResponse({"message": "Nieprawidłowa metoda żądania."}, status=405)
 
     try:
         data = json.loads(request.body)
         username = data.get('username')
         user = CustomUser.objects.filter(username=username).first()
         if user is None:
-            return JsonResponse({"message": "Nie znaleziono użytkownika z tym nickiem."}, status=404)
+            return ORJSONResponse({"message": "Nie znaleziono użytkownika z tym nickiem."}, status=404)
 
 
     except json.JSONDecodeError:
@@ -903,23 +1064,22 @@ def resend_verification_email(request):
 
     existing_token = EmailVerificationToken.objects.filter(user=user, verified=False, expires_at__gt=now()).first()
     if existing_token:
-        return JsonResponse({"message": "Link weryfikacyjny już został wysłany i jest nadal aktualny."}, status=400)
+        return ORJSONResponse({"message": "Link weryfikacyjny już został wysłany i jest nadal aktualny."}, status=400)
 
-    EmailVerificationToken.objects.filter(user=user, verified=False).delete()
+    with transaction.atomic():
+        EmailVerificationToken.objects.filter(user=user, verified=False).delete()
 
-    token = EmailVerificationToken.objects.create(user=user)
-    message_html = render_to_string('email_verification.html', {'token': token.token})
+        token = EmailVerificationToken.objects.create(user=user)
+        message_html = render_to_string('email_verification.html', {'token': token.token})
 
-    send_mail(
-        '[Fitter] Weryfikacja konta',
-        f'',
-        'fitterauth@gmail.com',
-        [user.email],
-        html_message=message_html,
-
-        fail_silently=False,
-    )
-    return JsonResponse({"message": "Link weryfikacyjny został ponownie wysłany."}, status=200)
+        queue_email(
+            '[Fitter] Weryfikacja konta',
+            f'',
+            'fitterauth@gmail.com',
+            [user.email],
+            html_message=message_html,
+        )
+    return ORJSONResponse({"message": "Link weryfikacyjny został ponownie wysłany."}, status=200)
 
 
 User = get_user_model()
@@ -943,3 +1103,13 @@ def change_password(request):
     user.set_password(new_password)
     user.save()
     return Response({'success': 'Hasło zmienione pomyślnie'})
+
+
+def metrics_view(request):
+    # Dostęp dla zalogowanego w panelu admina albo dla Prometheusa z tokenem METRICS_TOKEN
+    token = settings.METRICS_TOKEN
+    authorization = request.headers.get('Authorization', '')
+    if not (request.user.is_staff or token and hmac.compare_digest(authorization, f'Bearer {token}')):
+        return HttpResponse(status=403)
+
+    return HttpResponse(render_prometheus(*metrics_registry.collect()), content_type='text/plain; version=0.0.4')
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'inz_server.settings')
 
 application = get_wsgi_application()
+
+from inz_server.exercise_index import exercise_index  # noqa: E402
+
+exercise_index.warm()